@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.recognizer import peak_boxes
+
+# The pixel-loop deduplication peak_boxes replaced, kept here for comparison
+def deduplicate_boxes(boxes, min_dist=5):
+  filtered = []
+  for x, y, w, h in boxes:
+    cx, cy = x + w // 2, y + h // 2
+    if all(abs(cx - (fx + fw // 2)) > min_dist or abs(cy - (fy + fh // 2)) > min_dist
+        for fx, fy, fw, fh in filtered):
+      filtered.append((x, y, w, h))
+  return filtered
+
+def old_boxes(result, threshold, w, h):
+  loc = np.where(result >= threshold)
+  return deduplicate_boxes([(x, y, w, h) for (x, y) in zip(*loc[::-1])])
+
+def fake_result(shape, peaks, spread, seed=0):
+  """Match-result matrix with Gaussian blobs, spread controls how many pixels pass"""
+  rng = np.random.default_rng(seed)
+  yy, xx = np.mgrid[:shape[0], :shape[1]]
+  result = rng.uniform(-0.2, 0.2, shape).astype(np.float32)
+  for _ in range(peaks):
+    cy, cx = rng.integers(0, shape[0]), rng.integers(0, shape[1])
+    blob = np.exp(-((yy - cy) ** 2 + (xx - cx) ** 2) / (2 * spread ** 2))
+    result = np.maximum(result, blob.astype(np.float32))
+  return result
+
+def timed(fn, repeat):
+  started = time.perf_counter()
+  for _ in range(repeat):
+    value = fn()
+  return value, (time.perf_counter() - started) / repeat * 1000
+
+if __name__ == "__main__":
+  cases = [
+    ("support icons", (527, 83), 3, 1.5, 0.8),
+    ("loose threshold", (527, 83), 3, 4.0, 0.5),
+    ("full screen G1", (1052, 1885), 6, 3.0, 0.6),
+    ("full screen loose", (1052, 1885), 6, 12.0, 0.3),
+  ]
+  for name, shape, peaks, spread, threshold in cases:
+    result = fake_result(shape, peaks, spread)
+    candidates = int((result >= threshold).sum())
+    old, old_ms = timed(lambda: old_boxes(result, threshold, 18, 19), 3)
+    new, new_ms = timed(lambda: peak_boxes(result, threshold, 18, 19), 3)
+    print(f"{name:>16}: {candidates:6d} candidates | old {len(old):3d} boxes {old_ms:9.2f} ms | new {len(new):3d} boxes {new_ms:7.2f} ms")
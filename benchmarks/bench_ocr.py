@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.frame_source import set_frame_source
+from utils.screenshot import refresh_frame, get_region, enhanced_screenshot
+from utils.constants import MOOD_REGION, TURN_REGION, FAILURE_REGION, YEAR_REGION, CRITERIA_REGION, SKILL_PTS_REGION, STAT_REGIONS
+from core.layout import get_layout, scaled
+from core.ocr import create_reader, read_field
+from core.ocr_cache import crop_digest
+from core.vocabulary import edit_distance
+from replay import build_source
+
+# The HUD fields OCR reads during a turn, with what is read from them
+FIELDS = {
+  "year": (YEAR_REGION, "text"),
+  "criteria": (CRITERIA_REGION, "text"),
+  "turn": (TURN_REGION, "text"),
+  "failure": (FAILURE_REGION, "text"),
+  "skill_points": (SKILL_PTS_REGION, "number"),
+  **{stat: (region, "number") for stat, region in STAT_REGIONS.items()},
+}
+
+def collect_crops(path):
+  """{"<frame>/<field>": (img, kind)} of every distinct HUD crop of the recorded frames"""
+  crops = {}
+  seen = set()
+  frames = 0
+  set_frame_source(build_source(path, realtime=False))
+  while True:
+    try:
+      refresh_frame()
+    except EOFError:
+      break
+    frames += 1
+    get_layout()
+    fields = {name: (enhanced_screenshot(scaled(region)), kind) for name, (region, kind) in FIELDS.items()}
+    fields["mood"] = (get_region(scaled(MOOD_REGION))[:, :, ::-1].copy(), "text")
+    for name, (img, kind) in fields.items():
+      digest = crop_digest(img, kind)
+      if digest not in seen:
+        seen.add(digest)
+        crops[f"{frames}/{name}"] = (img, kind)
+  set_frame_source(None)
+  print(f"{len(crops)} distinct crops from {frames} frames")
+  return crops
+
+def run(reader, crops, repeat):
+  """({crop: text}, [seconds per read, ...]) of a reader over the corpus"""
+  img, kind = next(iter(crops.values()))
+  read_field(img, kind, reader)  # the first call sets up torch, it is not timed
+  texts = {}
+  timings = []
+  for _ in range(repeat):
+    for key, (img, kind) in crops.items():
+      started = time.perf_counter()
+      texts[key] = read_field(img, kind, reader)
+      timings.append(time.perf_counter() - started)
+  return texts, timings
+
+def accuracy(texts, labels):
+  """(share read exactly, character error rate) over the crops that have a label"""
+  keys = [key for key in texts if key in labels]
+  if not keys:
+    return 0.0, 0.0
+  exact = sum(texts[key].strip() == labels[key].strip() for key in keys)
+  errors = sum(edit_distance(texts[key].strip(), labels[key].strip()) for key in keys)
+  chars = sum(max(len(labels[key].strip()), 1) for key in keys)
+  return exact / len(keys), errors / chars
+
+def bench(path, labels_path=None, save_labels=None, repeat=1):
+  crops = collect_crops(path)
+  if not crops:
+    return
+
+  results = {}
+  for name, quantized in (("float32", False), ("int8", True)):
+    started = time.perf_counter()
+    reader = create_reader(quantized)
+    print(f"{name}: reader loaded in {time.perf_counter() - started:.1f} s")
+    results[name] = run(reader, crops, repeat)
+
+  # Without hand-checked labels the full precision model is the reference
+  if labels_path:
+    with open(labels_path, "r", encoding="utf-8") as f:
+      labels = json.load(f)
+    reference = "labels"
+  else:
+    labels = results["float32"][0]
+    reference = "float32"
+  if save_labels:
+    with open(save_labels, "w", encoding="utf-8") as f:
+      json.dump(results["float32"][0], f, indent=2, ensure_ascii=False)
+    print(f"float32 texts saved to {save_labels}, correct them and pass them with --labels")
+
+  print(f"\nAccuracy against {reference}, {len(crops)} crops x {repeat}")
+  for name, (texts, timings) in results.items():
+    timings = sorted(timings)
+    exact, cer = accuracy(texts, labels)
+    print(
+      f"{name:>8}: avg {sum(timings) / len(timings) * 1000:7.2f} ms, p95 {timings[int(len(timings) * 0.95)] * 1000:7.2f} ms, "
+      f"exact {exact:6.1%}, char errors {cer:6.2%}"
+    )
+  float_avg = sum(results["float32"][1]) / len(results["float32"][1])
+  int8_avg = sum(results["int8"][1]) / len(results["int8"][1])
+  print(f"int8 speed-up: {float_avg / int8_avg if int8_avg else 0:.2f}x")
+
+  changed = [key for key in crops if results["int8"][0][key] != results["float32"][0][key]]
+  for key in changed[:20]:
+    print(f"  {key}: float32 {results['float32'][0][key]!r}, int8 {results['int8'][0][key]!r}")
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Compare the full precision and the int8 OCR recognizer on recorded HUD crops")
+  parser.add_argument("path", nargs="?", default="screenshot.png", help="PNG file, folder of PNGs or recorded session folder")
+  parser.add_argument("--labels", help="JSON of the right text per crop, {\"<frame>/<field>\": text}")
+  parser.add_argument("--save-labels", help="write the full precision texts here, as a starting point for --labels")
+  parser.add_argument("--repeat", type=int, default=3, help="how many times every crop is read per model")
+  args = parser.parse_args()
+  bench(args.path, args.labels, args.save_labels, args.repeat)
@@ -4,9 +4,14 @@ import json
 
 pyautogui.useImageNotFoundException(False)
 
-from core.state import check_support_card, check_failure, check_turn, check_mood, check_current_year, check_criteria, check_skill_points_cap
+from core.state import check_support_card, submit_failure, check_skill_points_cap, game_state
 from core.logic import do_something, do_something_fallback, all_training_unsafe, MAX_FAILURE
 from utils.constants import MOOD_LIST
+from utils.screenshot import refresh_frame
+from utils import inputs
+from utils.capture import get_capture_service
+from utils.recorder import annotate
+from core.transitions import note_action
 
 def is_racing_available(year):
   """Check if racing is available based on the current year/month"""
@@ -15,7 +20,8 @@ def is_racing_available(year):
   if len(year_parts) > 3 and year_parts[3] in ["Jul", "Aug"]:
     return False
   return True
-from core.recognizer import is_infirmary_active, match_template
+from core.layout import scaled_point, scaled_size
+from core.recognizer import is_infirmary_active, match_template, locate, locate_all, locate_center
 from utils.scenario import ura
 
 with open("config.json", "r", encoding="utf-8") as file:
@@ -25,16 +31,28 @@ MINIMUM_MOOD = config["minimum_mood"]
 PRIORITIZE_G1_RACE = config["prioritize_g1_race"]
 
 def click(img, confidence = 0.8, minSearch = 2, click = 1, text = ""):
-  btn = pyautogui.locateCenterOnScreen(img, confidence=confidence, minSearchTime=minSearch)
+  btn = locate(img, confidence=confidence, min_search_time=minSearch)
   if btn:
-    if text:
-      print(text)
-    pyautogui.moveTo(btn, duration=0.175)
-    pyautogui.click(clicks=click)
+    click_box(btn, click=click, text=text)
     return True
   
   return False
 
+# Opening the race list changes nothing yet, the race itself ends in after_race
+READ_ONLY_ACTIONS = {"race", "race_g1"}
+
+def record_action(action):
+  annotate(action=action)
+  note_action(action)
+  if action not in READ_ONLY_ACTIONS:
+    game_state().invalidate()
+
+def click_box(box, click = 1, text = ""):
+  if text:
+    print(text)
+  pyautogui.moveTo(box.left + box.width // 2, box.top + box.height // 2, duration=0.175)
+  inputs.click(clicks=click)
+
 def go_to_training():
   return click("assets/buttons/training_btn.png")
 
@@ -47,55 +65,68 @@ def check_training():
     "wit": "assets/icons/train_wit.png"
   }
   results = {}
-
-  for key, icon_path in training_types.items():
-    pos = pyautogui.locateCenterOnScreen(icon_path, confidence=0.8)
-    if pos:
-      pyautogui.moveTo(pos, duration=0.1)
-      pyautogui.mouseDown()
+  failures = {}
+
+  # All five icons searched at once, before any of them is held down
+  icons = locate_all(training_types, confidence=0.8)
+  for key, box in icons.items():
+    if box:
+      # The panel can shift after a press, check the icon is still there before pressing it
+      around = (box.left - box.width // 2, box.top - box.height // 2, box.width * 2, box.height * 2)
+      box = locate(training_types[key], confidence=0.8, region=around) or locate(training_types[key], confidence=0.8)
+    if box:
+      pyautogui.moveTo(box.left + box.width // 2, box.top + box.height // 2, duration=0.1)
+      inputs.mouseDown()
+      refresh_frame()
       support_counts = check_support_card()
       total_support = sum(support_counts.values())
-      failure_chance = check_failure()
+      # The failure chance is read while the next training is pressed
+      failures[key] = submit_failure()
       results[key] = {
         "support": support_counts,
         "total_support": total_support,
-        "failure": failure_chance
       }
-      print(f"[{key.upper()}] → {support_counts}, Fail: {failure_chance}%")
       time.sleep(0.1)
   
-  pyautogui.mouseUp()
+  inputs.mouseUp()
+  for key, failure in failures.items():
+    results[key]["failure"] = failure.result()
+    print(f"[{key.upper()}] → {results[key]['support']}, Fail: {results[key]['failure']}%")
   click(img="assets/buttons/back_btn.png")
   return results
 
 def do_train(train):
-  train_btn = pyautogui.locateCenterOnScreen(f"assets/icons/train_{train}.png", confidence=0.8)
+  record_action(f"train_{train}")
+  train_btn = locate_center(f"assets/icons/train_{train}.png", confidence=0.8)
   if train_btn:
-    pyautogui.tripleClick(train_btn, interval=0.1, duration=0.2)
+    inputs.tripleClick(train_btn, interval=0.1, duration=0.2)
 
 def do_rest():
-  rest_btn = pyautogui.locateCenterOnScreen("assets/buttons/rest_btn.png", confidence=0.8)
-  rest_summber_btn = pyautogui.locateCenterOnScreen("assets/buttons/rest_summer_btn.png", confidence=0.8)
+  record_action("rest")
+  rest_btn = locate_center("assets/buttons/rest_btn.png", confidence=0.8)
+  rest_summber_btn = locate_center("assets/buttons/rest_summer_btn.png", confidence=0.8)
 
   if rest_btn:
     pyautogui.moveTo(rest_btn, duration=0.15)
-    pyautogui.click(rest_btn)
+    inputs.click(rest_btn)
   elif rest_summber_btn:
     pyautogui.moveTo(rest_summber_btn, duration=0.15)
-    pyautogui.click(rest_summber_btn)
+    inputs.click(rest_summber_btn)
 
 def do_recreation():
-  recreation_btn = pyautogui.locateCenterOnScreen("assets/buttons/recreation_btn.png", confidence=0.8)
-  recreation_summer_btn = pyautogui.locateCenterOnScreen("assets/buttons/rest_summer_btn.png", confidence=0.8)
+  record_action("recreation")
+  recreation_btn = locate_center("assets/buttons/recreation_btn.png", confidence=0.8)
+  recreation_summer_btn = locate_center("assets/buttons/rest_summer_btn.png", confidence=0.8)
 
   if recreation_btn:
     pyautogui.moveTo(recreation_btn, duration=0.15)
-    pyautogui.click(recreation_btn)
+    inputs.click(recreation_btn)
   elif recreation_summer_btn:
     pyautogui.moveTo(recreation_summer_btn, duration=0.15)
-    pyautogui.click(recreation_summer_btn)
+    inputs.click(recreation_summer_btn)
 
 def do_race(prioritize_g1 = False):
+  record_action("race_g1" if prioritize_g1 else "race")
   click(img="assets/buttons/races_btn.png", minSearch=10)
   click(img="assets/buttons/ok_btn.png", minSearch=0.7)
 
@@ -119,6 +150,7 @@ def race_day():
   
   enable_skill_check = config.get("enable_skill_point_check", True)
   
+  record_action("race_day")
   if enable_skill_check:
     print("[INFO] Race Day - Checking skill points cap...")
     check_skill_points_cap()
@@ -137,7 +169,7 @@ def race_day():
   after_race()
 
 def race_select(prioritize_g1 = False):
-  pyautogui.moveTo(x=560, y=680)
+  pyautogui.moveTo(*scaled_point(560, 680))
 
   time.sleep(0.2)
 
@@ -148,65 +180,66 @@ def race_select(prioritize_g1 = False):
 
       if race_card:
         for x, y, w, h in race_card:
-          region = (x, y, 310, 90)
-          match_aptitude = pyautogui.locateCenterOnScreen("assets/ui/match_track.png", confidence=0.8, minSearchTime=0.7, region=region)
+          region = (x, y, scaled_size(310), scaled_size(90))
+          match_aptitude = locate_center("assets/ui/match_track.png", confidence=0.8, min_search_time=0.7, region=region)
           if match_aptitude:
             print("[INFO] G1 race found.")
             pyautogui.moveTo(match_aptitude, duration=0.2)
-            pyautogui.click()
+            inputs.click()
             for i in range(2):
-              race_btn = pyautogui.locateCenterOnScreen("assets/buttons/race_btn.png", confidence=0.8, minSearchTime=2)
+              race_btn = locate_center("assets/buttons/race_btn.png", confidence=0.8, min_search_time=2)
               if race_btn:
                 pyautogui.moveTo(race_btn, duration=0.2)
-                pyautogui.click(race_btn)
+                inputs.click(race_btn)
                 time.sleep(0.5)
             return True
       
       for i in range(4):
-        pyautogui.scroll(-300)
+        inputs.scroll(-300)
     
     return False
   else:
     print("[INFO] Looking for race.")
     for i in range(4):
-      match_aptitude = pyautogui.locateCenterOnScreen("assets/ui/match_track.png", confidence=0.8, minSearchTime=0.7)
+      match_aptitude = locate_center("assets/ui/match_track.png", confidence=0.8, min_search_time=0.7)
       if match_aptitude:
         print("[INFO] Race found.")
         pyautogui.moveTo(match_aptitude, duration=0.2)
-        pyautogui.click(match_aptitude)
+        inputs.click(match_aptitude)
 
         for i in range(2):
-          race_btn = pyautogui.locateCenterOnScreen("assets/buttons/race_btn.png", confidence=0.8, minSearchTime=2)
+          race_btn = locate_center("assets/buttons/race_btn.png", confidence=0.8, min_search_time=2)
           if race_btn:
             pyautogui.moveTo(race_btn, duration=0.2)
-            pyautogui.click(race_btn)
+            inputs.click(race_btn)
             time.sleep(0.5)
         return True
       
       for i in range(4):
-        pyautogui.scroll(-300)
+        inputs.scroll(-300)
     
     return False
 
 def race_prep():
-  view_result_btn = pyautogui.locateCenterOnScreen("assets/buttons/view_results.png", confidence=0.8, minSearchTime=20)
+  view_result_btn = locate_center("assets/buttons/view_results.png", confidence=0.8, min_search_time=20)
   if view_result_btn:
-    pyautogui.click(view_result_btn)
+    inputs.click(view_result_btn)
     time.sleep(0.5)
     for i in range(4):
-      pyautogui.tripleClick(interval=0.2)
+      inputs.tripleClick(interval=0.2)
       time.sleep(0.5)
 
 def after_race():
+  game_state().invalidate()
   click(img="assets/buttons/next_btn.png", minSearch=10)
   time.sleep(0.5) # Raise a bit
-  pyautogui.click()
+  inputs.click()
   click(img="assets/buttons/next2_btn.png", minSearch=10)
 
 import json
 import os
 from utils.event_helper import get_event_text, extract_event_info
-from utils.event_recognizer import is_event_screen
+from core.screen import classify_screen
 from utils.choice_analyzer import calculate_choice_score
 import pyautogui
 
@@ -218,15 +251,20 @@ def career_lobby():
   
   while True:
     current_time = time.time()
+    # One frame tells which screen we are on
+    screen = classify_screen()
+
     # First check, event
-    is_event, button_pos = is_event_screen()
-    if is_event and button_pos:
+    if screen.label == "event":
         # Give the UI time to stabilize after detection
-        time.sleep(1)
+        service = get_capture_service()
+        if not service or not service.stable(duration_ms=300, timeout=2)[0]:
+          time.sleep(1)
         
         print("[INFO] Event detected, analyzing choices...")
         
         # Get event text and choices
+        refresh_frame()
         event_text, choices = extract_event_info()
         if not event_text:
             print("[WARNING] Could not read event text")
@@ -300,38 +338,37 @@ def career_lobby():
         if choice_scores:
             best_choice = max(choice_scores, key=lambda x: x[1])
             best_choice_num = best_choice[0]
+            annotate(screen="event", ocr={"event": event_text}, action=f"choice_{best_choice_num}")
+            note_action(f"choice_{best_choice_num}")
+            game_state().invalidate()
             print(f"[INFO] Best choice: {best_choice_num} (Score: {best_choice[1]:.1f})")
             
             # Try to click the best choice
             try:
-                from utils.event_recognizer import click_choice, find_event_choice_button
+                from utils.event_recognizer import click_choice, find_event_choice_buttons
                 # Check all button positions first for debugging
                 # Determine total number of choices
                 total_choices = len(choices)
                 print(f"[DEBUG] Event has {total_choices} choices")
                 
+                # Every choice button is searched at once
                 print("[DEBUG] Current button locations:")
-                for i in range(1, total_choices + 1):
-                    pos = find_event_choice_button(i, total_choices)
+                buttons = find_event_choice_buttons(total_choices)
+                for i, pos in buttons.items():
                     if pos:
                         print(f"[DEBUG] Choice {i} button found at: ({pos[0]}, {pos[1]})")
                     else:
                         print(f"[DEBUG] Choice {i} button not found")
                 
-                # Do the scan first to find our target button
-                print(f"[DEBUG] Attempting to click choice {best_choice_num}...")
                 # Get the button position from our previous scan
-                pos = None
-                for i in range(1, total_choices + 1):
-                    if i == best_choice_num:
-                        pos = find_event_choice_button(i, total_choices)
-                        break
+                print(f"[DEBUG] Attempting to click choice {best_choice_num}...")
+                pos = buttons.get(best_choice_num)
                 
                 if pos:
                     x, y = pos
                     # Move mouse up 50px first to avoid UI elements
                     pyautogui.moveTo(x, y - 50, duration=0.2)
-                    pyautogui.click(x, y)
+                    inputs.click(x, y)
                     print(f"[DEBUG] Clicked choice {best_choice_num} at ({x}, {y})")
                     time.sleep(0.5)  # Small delay after click
                     time.sleep(0.5)  # Small delay after click
@@ -344,21 +381,26 @@ def career_lobby():
             print("[INFO] Event text:", event_text)
             print("[INFO] Please add this event to the database if needed.")
             return  # Exit the function to stop automation
+        continue
 
     # Second check, inspiration
-    if click(img="assets/buttons/inspiration_btn.png", minSearch=0.2, text="[INFO] Inspiration found."):
+    if screen.label == "inspiration":
+        click_box(screen.buttons["inspiration"], text="[INFO] Inspiration found.")
+        record_action("click_inspiration")
         continue
 
-    if click(img="assets/buttons/next_btn.png", minSearch=0.2):
+    if screen.label == "next":
+        click_box(screen.buttons["next"])
+        record_action("click_next")
         continue
 
-    if click(img="assets/buttons/cancel_btn.png", minSearch=0.2):
+    if screen.label == "cancel":
+      click_box(screen.buttons["cancel"])
+      record_action("click_cancel")
       continue
 
     # Check if current menu is in career lobby
-    tazuna_hint = pyautogui.locateCenterOnScreen("assets/ui/tazuna_hint.png", confidence=0.8, minSearchTime=0.2)
-
-    if tazuna_hint is None:
+    if screen.label != "lobby":
       current_state = "waiting_for_lobby"
       if last_state != current_state or (current_time - last_message_time) >= message_cooldown:
         print("[INFO] Waiting for career lobby...")
@@ -369,24 +411,30 @@ def career_lobby():
     time.sleep(0.5)
 
     # Check if there is debuff status
-    debuffed = pyautogui.locateOnScreen("assets/buttons/infirmary_btn2.png", confidence=0.9, minSearchTime=1)
+    debuffed = locate("assets/buttons/infirmary_btn2.png", confidence=0.9, min_search_time=1)
     if debuffed:
       if is_infirmary_active((debuffed.left, debuffed.top, debuffed.width, debuffed.height)):
-        pyautogui.click(debuffed)
+        inputs.click(debuffed)
+        game_state().invalidate()
         print("[INFO] Character has debuff, go to infirmary instead.")
         continue
 
-    mood = check_mood()
+    # One capture for every state reader of this turn, each field is read once
+    refresh_frame()
+    state = game_state()
+    state.invalidate()
+    mood = state.mood
     mood_index = MOOD_LIST.index(mood)
     minimum_mood = MOOD_LIST.index(MINIMUM_MOOD)
-    turn = check_turn()
-    year = check_current_year()
-    criteria = check_criteria()
+    turn = state.turn
+    year = state.year
+    criteria = state.criteria
     
     print("\n=======================================================================================\n")
     print(f"Year: {year}")
     print(f"Mood: {mood}")
     print(f"Turn: {turn}\n")
+    annotate(screen="lobby", ocr={"mood": mood, "turn": turn, "year": year, "criteria": criteria})
 
     # URA SCENARIO
     if year == "Finale Season" and turn == "Race Day":
@@ -403,7 +451,7 @@ def career_lobby():
       
       if enable_skill_check:
         print("[INFO] URA Finale Race Day - Checking skill points cap...")
-        check_skill_points_cap()
+        check_skill_points_cap(state.skill_points)
       
       ura()
       for i in range(2):
@@ -428,7 +476,7 @@ def career_lobby():
       continue
 
     # Check if goals is not met criteria AND it is not Pre-Debut AND turn is less than 10 AND Goal is already achieved
-    if criteria.split(" ")[0] != "criteria" and year != "Junior Year Pre-Debut" and turn < 10 and criteria != "Goal Achievedl":
+    if criteria.split(" ")[0] != "criteria" and year != "Junior Year Pre-Debut" and turn < 10 and criteria != "Goal Achieved":
       race_found = do_race()
       if race_found:
         continue
@@ -455,9 +503,11 @@ def career_lobby():
 
     # Last, do training
     time.sleep(0.5)
-    results_training = check_training()
+    state.training = check_training()
+    results_training = state.training
+    annotate(screen="training", ocr=results_training)
     
-    best_training = do_something(results_training)
+    best_training = do_something(state)
     if best_training == "PRIORITIZE_RACE":
       print("[INFO] Prioritizing race due to insufficient support cards.")
       
@@ -482,7 +532,7 @@ def career_lobby():
         click(img="assets/buttons/back_btn.png", text="[INFO] Race not found. Proceeding to training.")
         time.sleep(0.5)
         # Re-evaluate training without race prioritization
-        best_training = do_something_fallback(results_training)
+        best_training = do_something_fallback(state)
         if best_training:
           go_to_training()
           time.sleep(0.5)
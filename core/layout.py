@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import numpy as np
+
+from utils.screenshot import get_frame, get_frame_origin
+from core.templates import load_templates, set_template_scale, save_template_bank, TEMPLATE_DIRS
+
+# Every region and coordinate in the code is written for a maximized 1920x1080 window.
+# The layout maps them onto the window that is actually there.
+BASE_WIDTH, BASE_HEIGHT = 1920, 1080
+LAYOUT_DIR = "layouts"      # one measured layout (and its scaled templates) per resolution
+DARK = 16                   # brighter than this is game, darker is border
+ASPECT_TOLERANCE = 0.02
+
+class Layout:
+  """Uniform scale plus offset from base coordinates to screen coordinates"""
+  __slots__ = ("width", "height", "scale", "left", "top")
+
+  def __init__(self, width, height, scale, left, top):
+    self.width = width
+    self.height = height
+    self.scale = scale
+    self.left = left
+    self.top = top
+
+  def point(self, x, y) -> tuple:
+    return (round(self.left + x * self.scale), round(self.top + y * self.scale))
+
+  def size(self, length) -> int:
+    return max(1, round(length * self.scale))
+
+  def region(self, region) -> tuple:
+    """(left, top, width, height) in base coordinates to screen coordinates"""
+    left, top = self.point(region[0], region[1])
+    return (left, top, self.size(region[2]), self.size(region[3]))
+
+  def bbox(self, bbox) -> tuple:
+    """(left, top, right, bottom) in base coordinates to screen coordinates"""
+    return self.point(bbox[0], bbox[1]) + self.point(bbox[2], bbox[3])
+
+  def full_screen(self) -> tuple:
+    return self.region((0, 0, BASE_WIDTH, BASE_HEIGHT))
+
+  def matches(self, other) -> bool:
+    """Same placement as another layout, give or take a pixel"""
+    if other is None or (self.width, self.height) != (other.width, other.height):
+      return False
+    return abs(self.scale - other.scale) * BASE_WIDTH < 1 and abs(self.left - other.left) < 1 and abs(self.top - other.top) < 1
+
+  def key(self) -> str:
+    return f"{self.width}x{self.height}"
+
+  def to_dict(self) -> dict:
+    return {name: getattr(self, name) for name in self.__slots__}
+
+_layout = None
+
+def _game_area(frame):
+  """(left, top, width, height) of the game inside the frame, dark borders cut off"""
+  brightness = frame[::4, ::4, :3].max(axis=2)
+  rows = np.nonzero(brightness.max(axis=1) > DARK)[0]
+  cols = np.nonzero(brightness.max(axis=0) > DARK)[0]
+  full = (0, 0, frame.shape[1], frame.shape[0])
+  if len(rows) == 0 or len(cols) == 0:
+    return full
+  left, top = cols[0] * 4, rows[0] * 4
+  width, height = (cols[-1] + 1) * 4 - left, (rows[-1] + 1) * 4 - top
+  # A dark scene is not a border, only trust a game-shaped, mostly full area
+  if abs(width / height - BASE_WIDTH / BASE_HEIGHT) > ASPECT_TOLERANCE * BASE_WIDTH / BASE_HEIGHT:
+    return full
+  if width * height < 0.5 * frame.shape[0] * frame.shape[1]:
+    return full
+  return (int(left), int(top), int(width), int(height))
+
+def measure_layout() -> Layout:
+  """Work out the layout from the current frame"""
+  frame = get_frame()
+  origin = get_frame_origin()
+  left, top, width, height = _game_area(frame)
+  scale = min(width / BASE_WIDTH, height / BASE_HEIGHT)
+  left += (width - BASE_WIDTH * scale) / 2
+  top += (height - BASE_HEIGHT * scale) / 2
+  return Layout(frame.shape[1], frame.shape[0], scale, origin[0] + left, origin[1] + top)
+
+def _path(key, ext) -> str:
+  return os.path.join(LAYOUT_DIR, f"{key}.{ext}")
+
+def _load_layout(key):
+  try:
+    with open(_path(key, "json"), "r", encoding="utf-8") as f:
+      return Layout(**json.load(f))
+  except (OSError, ValueError, TypeError):
+    return None
+
+def _save_layout(layout):
+  try:
+    os.makedirs(LAYOUT_DIR, exist_ok=True)
+    with open(_path(layout.key(), "json"), "w", encoding="utf-8") as f:
+      json.dump(layout.to_dict(), f, indent=2)
+  except OSError as e:
+    print(f"[WARNING] Failed to save layout: {e}")
+
+def apply_layout(dirs=TEMPLATE_DIRS) -> Layout:
+  """
+  Set up the layout for the current resolution and load templates to match.
+  The layout is measured every time; when it matches the one saved for this
+  resolution, the saved scaled template bank is reused if the assets did not change.
+  """
+  global _layout
+  started = time.time()
+  frame = get_frame()
+  key = f"{frame.shape[1]}x{frame.shape[0]}"
+  # Measuring is cheap, the saved layout is only trusted while it still matches
+  layout = measure_layout()
+  cached = layout.matches(_load_layout(key))
+  if not cached:
+    _save_layout(layout)
+  _layout = layout
+
+  set_template_scale(layout.scale)
+  bank = _path(key, "npz")
+  if layout.scale == 1.0:
+    load_templates(dirs)
+  elif not (cached and load_templates(dirs, bank=bank)):
+    load_templates(dirs)
+    save_template_bank(bank, dirs)
+  print(f"[INFO] Layout {key}: scale {layout.scale:.3f}, {'cached' if cached else 'measured'} in {(time.time() - started) * 1000:.0f} ms")
+  return layout
+
+def get_layout() -> Layout:
+  """Layout of the current resolution, set up again if the window size changed"""
+  frame = get_frame()
+  if _layout is None or (frame.shape[1], frame.shape[0]) != (_layout.width, _layout.height):
+    apply_layout()
+  return _layout
+
+def scaled(region) -> tuple:
+  """Base (left, top, width, height) region on the current screen"""
+  return get_layout().region(region)
+
+def scaled_bbox(bbox) -> tuple:
+  """Base (left, top, right, bottom) box on the current screen"""
+  return get_layout().bbox(bbox)
+
+def scaled_point(x, y) -> tuple:
+  return get_layout().point(x, y)
+
+def scaled_size(length) -> int:
+  return get_layout().size(length)
+
+def full_screen() -> tuple:
+  return get_layout().full_screen()
@@ -1,7 +1,5 @@
 import json
 
-from core.state import check_current_year, stat_state
-
 with open("config.json", "r", encoding="utf-8") as file:
   config = json.load(file)
 
@@ -117,12 +115,12 @@ def filter_by_stat_caps(results, current_stats):
   }
   
 # Decide training (with race prioritization)
-def do_something(results):
-  year = check_current_year()
-  current_stats = stat_state()
+def do_something(state):
+  year = state.year
+  current_stats = state.stats
   print(f"Current stats: {current_stats}")
 
-  filtered = filter_by_stat_caps(results, current_stats)
+  filtered = filter_by_stat_caps(state.training, current_stats)
 
   if not filtered:
     print("[INFO] All stats capped or no valid training.")
@@ -142,12 +140,12 @@ def do_something(results):
   return result
 
 # Decide training (without race prioritization - fallback)
-def do_something_fallback(results):
-  year = check_current_year()
-  current_stats = stat_state()
+def do_something_fallback(state):
+  year = state.year
+  current_stats = state.stats
   print(f"Current stats: {current_stats}")
 
-  filtered = filter_by_stat_caps(results, current_stats)
+  filtered = filter_by_stat_caps(state.training, current_stats)
 
   if not filtered:
     print("[INFO] All stats capped or no valid training.")
@@ -0,0 +1,53 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from core.templates import get_template
+from utils.screenshot import get_region
+from utils.change_detector import lookup, store, is_missing
+
+# One template searched in one (left, top, width, height) region of the shared frame
+MatchJob = namedtuple("MatchJob", "name template region confidence grayscale", defaults=(0.8, False))
+
+def physical_cores() -> int:
+  """Physical core count, assuming two threads per core: cv2.matchTemplate gains nothing from hyper-threads"""
+  return max(1, (os.cpu_count() or 2) // 2)
+
+# cv2.matchTemplate releases the GIL, so plain threads run matches side by side
+_pool = ThreadPoolExecutor(max_workers=physical_cores(), thread_name_prefix="matcher")
+
+def parallel_map(fn, items) -> list:
+  """fn applied to every item on the matcher threads, results in item order"""
+  items = list(items)
+  if len(items) < 2:
+    return [fn(item) for item in items]
+  return list(_pool.map(fn, items))
+
+def match_batch(jobs) -> dict:
+  """
+  Run every MatchJob against one frame and return {name: Box or None} once all are done.
+  Crops are taken up front so a refresh during the batch cannot mix frames, and
+  regions whose pixels did not change reuse their last result.
+  """
+  from core.recognizer import match_box  # recognizer matches on this pool too
+
+  results = {job.name: None for job in jobs}
+  pending = []
+  for job in jobs:
+    key = ("locate", job.template, job.region, job.confidence, job.grayscale)
+    crop = get_region(job.region)
+    signature, cached = lookup(key, job.region, crop)
+    if is_missing(cached):
+      pending.append((job, key, signature, crop))
+    else:
+      results[job.name] = cached
+
+  def run(item):
+    job, _, _, crop = item
+    return match_box(crop, job.region, get_template(job.template), job.confidence, job.grayscale)
+
+  # Each box is kept under the signature of the crop it was found in
+  for (job, key, signature, _), box in zip(pending, parallel_map(run, pending)):
+    store(key, job.region, signature, box)
+    results[job.name] = box
+  return results
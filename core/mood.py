@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+import cv2
+import numpy as np
+
+from utils.constants import MOOD_LIST
+
+# Every mood has a badge of its own colour, so the hue histogram of the badge tells
+# them apart without OCR. One centroid per mood, seeded from harvested screens and
+# refined with every mood OCR reads while the classifier is unsure.
+SEED_FILE = "assets/data/mood_colors.json"
+MOOD_COLORS_FILE = "mood_colors.json"
+HUE_BINS = 18
+MIN_SATURATION = 80   # the white label and arrow are left out
+MIN_VALUE = 80
+MIN_BADGE = 0.2       # share of the crop that must be badge colour
+MAX_DISTANCE = 0.35   # Hellinger distance to the nearest centroid, farther is unsure
+MIN_MARGIN = 0.15     # and the runner-up must be at least this much farther
+MAX_WEIGHT = 20       # samples a centroid averages over, newer screens keep counting
+
+_centroids = None     # mood -> {"hist": [...], "count": n}
+_unsaved = False
+
+def _load(paths=(SEED_FILE, MOOD_COLORS_FILE)):
+  global _centroids
+  if _centroids is None:
+    # Centroids learned here replace the seeded ones of the same mood
+    _centroids = {}
+    for path in paths:
+      try:
+        with open(path, "r", encoding="utf-8") as f:
+          _centroids.update(json.load(f))
+      except (OSError, ValueError):
+        continue
+  return _centroids
+
+def save_mood_colors(path=MOOD_COLORS_FILE):
+  global _unsaved
+  if not _unsaved and path == MOOD_COLORS_FILE:
+    return
+  tmp = path + ".tmp"
+  try:
+    with open(tmp, "w", encoding="utf-8") as f:
+      json.dump(_load(), f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+    _unsaved = False
+  except OSError as e:
+    print(f"[WARNING] Failed to save mood colours: {e}")
+
+def badge_histogram(crop):
+  """Square root of the normalized hue histogram of the badge's coloured pixels, None without a badge"""
+  hsv = cv2.cvtColor(np.ascontiguousarray(crop), cv2.COLOR_BGR2HSV)
+  colored = (hsv[..., 1] >= MIN_SATURATION) & (hsv[..., 2] >= MIN_VALUE)
+  if colored.mean() < MIN_BADGE:
+    return None
+  hist = np.bincount(hsv[..., 0][colored].astype(np.int32) * HUE_BINS // 180, minlength=HUE_BINS).astype(np.float32)
+  return np.sqrt(hist / hist.sum())
+
+def classify_mood(crop):
+  """(mood, confidence) of a BGR badge crop, (None, 0.0) when the colours do not settle it"""
+  centroids = _load()
+  # With a single centroid there is no runner-up to keep the margin honest
+  if len(centroids) < 2:
+    return None, 0.0
+  hist = badge_histogram(crop)
+  if hist is None:
+    return None, 0.0
+  moods = list(centroids)
+  bank = np.array([centroids[mood]["hist"] for mood in moods], dtype=np.float32)
+  # Euclidean distance between square-rooted histograms is the Hellinger distance (times sqrt 2)
+  distances = np.linalg.norm(bank - hist, axis=1) / np.sqrt(2)
+  order = np.argsort(distances)
+  best = distances[order[0]]
+  if best > MAX_DISTANCE or distances[order[1]] - best < MIN_MARGIN:
+    return None, 0.0
+  return moods[order[0]], float(1 - best)
+
+def learn_mood(crop, mood):
+  """Fold a badge whose mood is known, from OCR or by hand, into that mood's centroid"""
+  global _unsaved
+  hist = badge_histogram(crop)
+  if hist is None or mood not in MOOD_LIST or mood == "UNKNOWN":
+    return
+  centroids = _load()
+  entry = centroids.get(mood)
+  if entry is None:
+    centroids[mood] = {"hist": hist.tolist(), "count": 1}
+  else:
+    count = min(entry["count"] + 1, MAX_WEIGHT)
+    centroid = np.array(entry["hist"], dtype=np.float32)
+    centroid += (hist - centroid) / count
+    centroids[mood] = {"hist": centroid.tolist(), "count": count}
+  _unsaved = True
+
+if __name__ == "__main__":
+  # python -m core.mood <screenshot> <MOOD>, the badge is cut from MOOD_REGION of a 1920x1080 screenshot
+  from utils.constants import MOOD_REGION
+  if len(sys.argv) != 3 or sys.argv[2] not in MOOD_LIST[:-1]:
+    print(f"usage: python -m core.mood <screenshot> <{'|'.join(MOOD_LIST[:-1])}>")
+    sys.exit(1)
+  image = cv2.imread(sys.argv[1], cv2.IMREAD_COLOR)
+  left, top, width, height = MOOD_REGION
+  _load([SEED_FILE])
+  learn_mood(image[top:top + height, left:left + width], sys.argv[2])
+  save_mood_colors(SEED_FILE)
+  print(f"[INFO] Saved the {sys.argv[2]} badge colours to {SEED_FILE}")
@@ -1,17 +1,305 @@
-import easyocr
+import json
+import os
+import threading
+import time
+import cv2
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from PIL import Image
 import numpy as np
 
-reader = easyocr.Reader(["en"], gpu=False)
+from core.ocr_cache import ocr_lookup, ocr_store
 
-def extract_text(pil_img: Image.Image) -> str:
-  img_np = np.array(pil_img)
-  result = reader.readtext(img_np)
-  texts = [text[1] for text in result]
-  return " ".join(texts)
+with open("config.json", "r", encoding="utf-8") as file:
+  config = json.load(file)
+
+# The HUD regions are fixed, so the text detector can be skipped: each crop is
+# split into text lines with a row profile and the lines go straight to the
+# recognizer. The detector model is then never loaded.
+RECOGNITION_ONLY = config.get("ocr_recognition_only", False)
+LINE_GAP = 2          # rows without ink that still belong to the same line
+MIN_LINE_HEIGHT = 4
+BATCH_GAP = 8         # blank rows between crops stacked for one recognizer call
+
+# OCR can run in worker processes, each with its own reader, so the bot keeps
+# clicking and capturing while text is read. 0 reads on a thread of this process.
+OCR_WORKERS = config.get("ocr_workers", 0)
+
+# The recognizer runs on the CPU. easyocr can apply dynamic int8 quantization to its
+# LSTM and linear layers, faster for a small accuracy cost. benchmarks/bench_ocr.py compares both.
+QUANTIZED = config.get("ocr_quantized", True)
+
+# easyocr pulls in torch and two models, seconds of work. It is loaded on a
+# background thread at launch and only the first read waits for it.
+_reader = None
+_loader = None
+_load_error = None
+_load_seconds = 0.0
+_waited = None        # how long the first read waited for the load
+_wait_lock = threading.Lock()
+
+def create_reader(quantized=QUANTIZED):
+  """A new easyocr Reader set up as configured, only the quantization can be chosen"""
+  import easyocr
+  return easyocr.Reader(["en"], gpu=False, detector=not RECOGNITION_ONLY, quantize=quantized)
+
+def _load_reader():
+  global _reader, _load_error, _load_seconds
+  started = time.time()
+  try:
+    _reader = create_reader()
+  except Exception as e:
+    _load_error = e
+  _load_seconds = time.time() - started
+
+_pool = None           # worker processes, or one local thread without them
+_in_worker = False
+
+def warm_up():
+  """Start loading the OCR engine in the background, returns at once"""
+  global _loader
+  if OCR_WORKERS and not _in_worker:
+    start_ocr_workers()
+    return
+  if _loader is None:
+    _loader = threading.Thread(target=_load_reader, name="ocr-loader", daemon=True)
+    _loader.start()
 
-def extract_number(pil_img: Image.Image) -> int:
-  img_np = np.array(pil_img)
-  result = reader.readtext(img_np, allowlist="0123456789")
+def get_reader():
+  """The easyocr Reader, waits for the background load the first time"""
+  global _waited
+  if _waited is None:
+    with _wait_lock:
+      if _waited is None:
+        warm_up()
+        started = time.time()
+        _loader.join()
+        _waited = time.time() - started
+        if _load_error is None:
+          print(f"[INFO] OCR engine loaded in {_load_seconds:.1f} s, first read waited {_waited:.1f} s ({_load_seconds - _waited:.1f} s saved)")
+  if _load_error is not None:
+    raise RuntimeError(f"OCR engine failed to load: {_load_error}") from _load_error
+  return _reader
+
+ALLOWLISTS = {"text": None, "number": "0123456789"}
+
+def _gray(img) -> np.ndarray:
+  return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY) if img.ndim == 3 else img
+
+def text_lines(gray) -> list:
+  """
+  [x_min, x_max, y_min, y_max] boxes of the text lines of a grayscale crop, found
+  from the rows holding ink (the minority colour after Otsu). Whole crop if unsure.
+  """
+  h, w = gray.shape
+  whole = [[0, w, 0, h]]
+  _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+  ink = binary if binary.mean() < 0.5 else 1 - binary
+  rows = ink.any(axis=1)
+  if not rows.any():
+    return whole
+
+  # Runs of inked rows, joined across small gaps
+  edges = np.flatnonzero(np.diff(np.r_[0, rows.astype(np.int8), 0]))
+  starts, ends = edges[::2], edges[1::2]
+  new_line = np.r_[True, starts[1:] - ends[:-1] > LINE_GAP]
+  starts, ends = starts[new_line], ends[np.r_[new_line[1:], True]]
+  lines = []
+  for top, bottom in zip(starts, ends):
+    if bottom - top < MIN_LINE_HEIGHT:
+      continue
+    cols = np.flatnonzero(ink[top:bottom].any(axis=0))
+    lines.append([int(max(cols[0] - 2, 0)), int(min(cols[-1] + 3, w)), int(max(top - 2, 0)), int(min(bottom + 2, h))])
+  return lines or whole
+
+def _recognize(gray, lines, allowlist, reader=None) -> list:
+  """[(y_min, text), ...] for known line boxes, no detector involved"""
+  result = (reader or get_reader()).recognize(gray, horizontal_list=lines, free_list=[], allowlist=allowlist, batch_size=max(1, len(lines)))
+  return sorted((box[0][1], text) for box, text, _ in result)
+
+def _read(img_np, kind, reader=None) -> str:
+  if RECOGNITION_ONLY:
+    gray = _gray(img_np)
+    return " ".join(text for _, text in _recognize(gray, text_lines(gray), ALLOWLISTS[kind], reader))
+  result = (reader or get_reader()).readtext(img_np, allowlist=ALLOWLISTS[kind])
   texts = [text[1] for text in result]
   return " ".join(texts)
+
+def read_field(img: Image.Image | np.ndarray, kind="text", reader=None) -> str:
+  """Text of a "text" or "number" crop, read right away on this thread without the cache"""
+  return _read(np.asarray(img), kind, reader)
+
+def _cache_kind(kind) -> str:
+  # The two modes do not read exactly alike, keep their results apart
+  return f"{kind}/recognize" if RECOGNITION_ONLY else kind
+
+def _init_worker(threads):
+  global _in_worker
+  _in_worker = True
+  try:
+    import torch
+    torch.set_num_threads(threads)  # the workers share the cores
+  except ImportError:
+    pass
+  warm_up()
+
+def _started() -> bool:
+  return True
+
+def start_ocr_workers(count=None):
+  """Start the OCR worker processes, they load their readers right away"""
+  global _pool
+  count = count or OCR_WORKERS
+  if _pool is None:
+    threads = max(1, (os.cpu_count() or 1) // count)
+    _pool = ProcessPoolExecutor(max_workers=count, initializer=_init_worker, initargs=(threads,))
+    # The pool only starts a process when a task finds no idle worker, so one
+    # empty task each starts them all now and their readers load before the first read
+    for _ in range(count):
+      _pool.submit(_started)
+
+def stop_ocr_workers():
+  global _pool
+  if _pool is not None:
+    _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+def _executor():
+  global _pool
+  if _pool is None:
+    _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
+  return _pool
+
+def completed(value) -> Future:
+  """A Future that already holds value, for results found without OCR"""
+  future = Future()
+  future.set_result(value)
+  return future
+
+def then(future, fn) -> Future:
+  """Future of fn(result of future), fn runs as soon as the OCR is done"""
+  return _gather([future], lambda: fn(future.result()))
+
+def _submit(img, kind) -> Future:
+  # Crops can be views of the shared frame, the read needs pixels of its own
+  img = np.array(img, copy=True)
+  digest, text = ocr_lookup(img, _cache_kind(kind))
+  if text is not None:
+    return completed(text)
+  future = _executor().submit(_read, img, kind)
+  def store(done):
+    if done.exception() is None:
+      ocr_store(digest, done.result())
+  future.add_done_callback(store)
+  return future
+
+def submit_text(img: Image.Image | np.ndarray) -> Future:
+  """extract_text without waiting, the Future holds the text"""
+  return _submit(img, "text")
+
+def submit_number(img: Image.Image | np.ndarray) -> Future:
+  return _submit(img, "number")
+
+def extract_text(img: Image.Image | np.ndarray) -> str:
+  # Every read goes through the executor, the reader is never used by two threads at once
+  return submit_text(img).result()
+
+def extract_number(img: Image.Image | np.ndarray) -> str:
+  return submit_number(img).result()
+
+def _pad_to(img, height, width) -> np.ndarray:
+  """Grow a crop to a common size with its own border colour, the text keeps its scale"""
+  h, w = img.shape[:2]
+  if (h, w) == (height, width):
+    return img
+  border = np.concatenate([img[0], img[-1], img[:, 0], img[:, -1]])
+  fill = np.median(border, axis=0)
+  fill = fill.tolist() if img.ndim == 3 else float(fill)
+  return cv2.copyMakeBorder(img, 0, height - h, 0, width - w, cv2.BORDER_CONSTANT, value=fill)
+
+def _read_group(images, kind) -> list:
+  """Texts of crops read together, padded to one size for easyocr's batched path"""
+  if RECOGNITION_ONLY:
+    return _recognize_stacked(images, ALLOWLISTS[kind])
+  height = max(img.shape[0] for img in images)
+  width = max(img.shape[1] for img in images)
+  batch = [_pad_to(img, height, width) for img in images]
+  found = get_reader().readtext_batched(batch, batch_size=len(batch), allowlist=ALLOWLISTS[kind])
+  return [" ".join(item[1] for item in result) for result in found]
+
+def submit_batch(crops) -> Future:
+  """
+  Read several named crops in as few model calls as possible, without waiting.
+  crops is a list of (name, img) or (name, img, kind), kind being "text" (default)
+  or "number". The Future holds {name: text}. Cached crops are not read again,
+  the rest goes through easyocr's batched path, one call per kind and colour
+  depth (per kind only in recognition-only mode).
+  """
+  results = {}
+  groups = {}
+  for crop in crops:
+    name, img = crop[0], np.array(crop[1], copy=True)
+    kind = crop[2] if len(crop) > 2 else "text"
+    digest, text = ocr_lookup(img, _cache_kind(kind))
+    if text is None:
+      groups.setdefault((kind, 0 if RECOGNITION_ONLY else img.ndim), []).append((name, img, digest))
+    else:
+      results[name] = text
+  if not groups:
+    return completed(results)
+
+  reads = [
+    (items, _executor().submit(_read_group, [img for _, img, _ in items], kind))
+    for (kind, _), items in groups.items()
+  ]
+  def collect():
+    for items, future in reads:
+      for (name, _, digest), text in zip(items, future.result()):
+        ocr_store(digest, text)
+        results[name] = text
+    return results
+  return _gather([future for _, future in reads], collect)
+
+def _gather(futures, fn) -> Future:
+  """Future of fn() once every future is done"""
+  gathered = Future()
+  remaining = [len(futures)]
+  lock = threading.Lock()
+  def one_done(_):
+    with lock:
+      remaining[0] -= 1
+      if remaining[0]:
+        return
+    try:
+      gathered.set_result(fn())
+    except Exception as e:
+      gathered.set_exception(e)
+  for future in futures:
+    future.add_done_callback(one_done)
+  return gathered
+
+def extract_batch(crops) -> dict:
+  """submit_batch, waiting for the result"""
+  return submit_batch(crops).result()
+
+def _recognize_stacked(images, allowlist) -> list:
+  """
+  Text of several crops from one recognizer call: the crops are stacked on one
+  grayscale canvas and every line box is sent together.
+  """
+  grays = [_gray(img) for img in images]
+  width = max(gray.shape[1] for gray in grays)
+  canvas = []
+  lines = []
+  tops = []
+  y = 0
+  for gray in grays:
+    tops.append(y)
+    lines += [[x0, x1, y0 + y, y1 + y] for x0, x1, y0, y1 in text_lines(gray)]
+    canvas.append(_pad_to(gray, gray.shape[0] + BATCH_GAP, width))
+    y += gray.shape[0] + BATCH_GAP
+
+  # Every line found goes back to the crop it was cut from
+  texts = [[] for _ in grays]
+  for top, text in _recognize(np.vstack(canvas), lines, allowlist):
+    texts[np.searchsorted(tops, top, side="right") - 1].append(text)
+  return [" ".join(parts) for parts in texts]
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+with open("config.json", "r", encoding="utf-8") as file:
+  config = json.load(file)
+
+# OCR results by the content of the crop that was read. The same pixels always
+# give the same text, so a hit skips the model entirely.
+MEMORY_ENTRIES = 2048
+DISK_CACHE = config.get("ocr_disk_cache", True)
+DISK_FILE = "ocr_cache.json"
+DISK_ENTRIES = 20000
+SAVE_EVERY = 50
+
+_memory = OrderedDict()   # digest -> text, least recently used first
+_disk = None              # digest -> text, loaded on first use
+_unsaved = 0
+_lock = threading.Lock()
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+def crop_digest(img, kind) -> str:
+  """Hash of a preprocessed crop's pixels, its shape and what is read from it"""
+  img = np.ascontiguousarray(img)
+  h = hashlib.blake2b(digest_size=16)
+  h.update(f"{kind}:{img.shape}:{img.dtype}".encode())
+  h.update(img.data)
+  return h.hexdigest()
+
+def _load_disk():
+  global _disk
+  if _disk is None:
+    try:
+      with open(DISK_FILE, "r", encoding="utf-8") as f:
+        _disk = json.load(f)
+    except (OSError, ValueError):
+      _disk = {}
+  return _disk
+
+def save_ocr_cache():
+  global _unsaved
+  if not DISK_CACHE or _disk is None:
+    return
+  with _lock:
+    # Newest entries are last, keep those
+    entries = dict(list(_disk.items())[-DISK_ENTRIES:])
+    _unsaved = 0
+  tmp = DISK_FILE + ".tmp"
+  try:
+    with open(tmp, "w", encoding="utf-8") as f:
+      json.dump(entries, f)
+    os.replace(tmp, DISK_FILE)
+  except OSError as e:
+    print(f"[WARNING] Failed to save OCR cache: {e}")
+
+def _remember(digest, text):
+  _memory[digest] = text
+  _memory.move_to_end(digest)
+  while len(_memory) > MEMORY_ENTRIES:
+    _memory.popitem(last=False)
+
+def ocr_lookup(img, kind):
+  """(digest, cached text or None) for a crop"""
+  digest = crop_digest(img, kind)
+  with _lock:
+    if digest in _memory:
+      _memory.move_to_end(digest)
+      _stats["hits"] += 1
+      return digest, _memory[digest]
+    if DISK_CACHE and digest in _load_disk():
+      _stats["disk_hits"] += 1
+      text = _disk[digest]
+      _remember(digest, text)
+      return digest, text
+    _stats["misses"] += 1
+  return digest, None
+
+def ocr_store(digest, text):
+  global _unsaved
+  save = False
+  with _lock:
+    _remember(digest, text)
+    if DISK_CACHE:
+      _load_disk()[digest] = text
+      _unsaved += 1
+      save = _unsaved >= SAVE_EVERY
+  if save:
+    save_ocr_cache()
+
+def ocr_cache_stats() -> dict:
+  hits = _stats["hits"] + _stats["disk_hits"]
+  total = hits + _stats["misses"]
+  return dict(_stats, hit_rate=hits / total if total else 0.0)
@@ -0,0 +1,61 @@
+import json
+import os
+
+from utils.screenshot import get_frame
+
+# Where buttons were found before, per screen resolution, kept between runs
+PRIORS_FILE = "layout_cache.json"
+TOLERANCE = 40     # pixels searched around a known spot
+MAX_SPOTS = 4      # spots remembered per template
+
+_priors = None
+_stats = {"prior_hits": 0, "full_searches": 0}
+
+def _load():
+  global _priors
+  if _priors is None:
+    try:
+      with open(PRIORS_FILE, "r", encoding="utf-8") as f:
+        _priors = json.load(f)
+    except (OSError, ValueError):
+      _priors = {}
+  return _priors
+
+def _save():
+  tmp = PRIORS_FILE + ".tmp"
+  try:
+    with open(tmp, "w", encoding="utf-8") as f:
+      json.dump(_priors, f, indent=2)
+    os.replace(tmp, PRIORS_FILE)
+  except OSError as e:
+    print(f"[WARNING] Failed to save layout cache: {e}")
+
+def resolution_key() -> str:
+  frame = get_frame()
+  return f"{frame.shape[1]}x{frame.shape[0]}"
+
+def prior_regions(template_path, width, height) -> list:
+  """Small (left, top, width, height) regions around the spots a template was found before"""
+  spots = _load().get(resolution_key(), {}).get(template_path, [])
+  return [
+    (max(x - TOLERANCE, 0), max(y - TOLERANCE, 0), width + 2 * TOLERANCE, height + 2 * TOLERANCE)
+    for x, y in spots
+  ]
+
+def remember(template_path, left, top):
+  """Record where a template was found, most recent spot first"""
+  spots = _load().setdefault(resolution_key(), {}).setdefault(template_path, [])
+  for i, (x, y) in enumerate(spots):
+    if abs(x - left) <= TOLERANCE // 2 and abs(y - top) <= TOLERANCE // 2:
+      spots.insert(0, spots.pop(i))
+      return
+  spots.insert(0, [int(left), int(top)])
+  del spots[MAX_SPOTS:]
+  _save()
+
+def count_prior(hit):
+  _stats["prior_hits" if hit else "full_searches"] += 1
+
+def prior_stats() -> dict:
+  total = _stats["prior_hits"] + _stats["full_searches"]
+  return dict(_stats, hit_rate=_stats["prior_hits"] / total if total else 0.0)
@@ -1,38 +1,282 @@
+import time
+import json
 import cv2
 import numpy as np
-from PIL import ImageGrab, ImageStat
+from collections import namedtuple
+from PIL import ImageStat
 
-from utils.screenshot import capture_region
+from utils.screenshot import capture_region, get_region, invalidate_frame
+from utils.frame_source import get_frame_source
+from utils.change_detector import cached_result
+from core.templates import get_template
+from core.priors import prior_regions, remember, count_prior
+from core.matcher import MatchJob, match_batch, parallel_map
+from core.layout import full_screen
+
+Box = namedtuple("Box", "left top width height")
+
+with open("config.json", "r", encoding="utf-8") as file:
+  config = json.load(file)
+
+# Coarse-to-fine matching for big searches
+PYRAMID_MATCHING = config.get("pyramid_matching", True)
+PYRAMID_SCALE = config.get("pyramid_scale", 0.5)
+PYRAMID_FALLBACK = config.get("pyramid_fallback", True)
+PYRAMID_MIN_AREA = 300 * 300      # smaller searches are cheap enough at full size
+PYRAMID_MIN_SIZE = 10             # scaled templates smaller than this lose too much detail
+PYRAMID_MARGIN = 0.2              # coarse scores run lower than full-size ones
+PYRAMID_FALLBACK_MARGIN = 0.1     # an unconfirmed coarse score this close earns a full search
+PYRAMID_CANDIDATES = 16
+MAX_PEAKS = 256                   # local maxima kept for the final suppression, strongest first
 
 def match_template(template_path, region=None, threshold=0.85):
-  # Get screenshot
+  """Every match of a template in a (left, top, right, bottom) region, [(x, y, w, h), ...] on the screen"""
+  if region:
+    left, top, right, bottom = region  # (left, top, right, bottom)
+    search = (left, top, right - left, bottom - top)
+  else:
+    search = full_screen()
+  # Same pixels give the same matches
+  key = ("match_template", template_path, search, threshold)
+  return cached_result(key, search, lambda: _match_template(template_path, search, threshold))
+
+def _match_template(template_path, search, threshold):
+  screen = get_region(search)
+  template = get_template(template_path)
+
+  if use_pyramid(search, template):
+    found = pyramid_match(screen, template, threshold)
+    if found is not None:
+      boxes = [(search[0] + x, search[1] + y, template.width, template.height) for x, y, _ in found]
+      return sorted(boxes, key=lambda box: (box[1], box[0]))
+
+  result = cv2.matchTemplate(screen, template.color, cv2.TM_CCOEFF_NORMED)
+  return [(search[0] + x, search[1] + y, w, h) for x, y, w, h in peak_boxes(result, threshold, template.width, template.height)]
+
+def use_pyramid(search, template) -> bool:
+  """Whether a search is big enough, and the template detailed enough, for pyramid matching"""
+  if not PYRAMID_MATCHING or search[2] * search[3] < PYRAMID_MIN_AREA:
+    return False
+  return min(template.height, template.width) * PYRAMID_SCALE >= PYRAMID_MIN_SIZE
+
+def pyramid_match(screen, template, threshold, grayscale=False, scale=PYRAMID_SCALE):
+  """
+  Find candidates on a downscaled screen, then confirm each one in a small
+  full-size window. Returns [(x, y, score), ...] best first, or None when the
+  coarse pass was too unsure and the caller should search at full size.
+  """
+  image = template.image(grayscale)
+  small_image = template.scaled(scale, grayscale)
+  small_screen = cv2.resize(screen, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+  if small_screen.shape[0] < small_image.shape[0] or small_screen.shape[1] < small_image.shape[1]:
+    return []
+
+  coarse = cv2.matchTemplate(small_screen, small_image, cv2.TM_CCOEFF_NORMED)
+  xs, ys = find_peaks(coarse, threshold - PYRAMID_MARGIN, max(1, int(5 * scale)))
+  candidates = sorted(zip(xs, ys), key=lambda p: -coarse[p[1], p[0]])
+  truncated = len(candidates) > PYRAMID_CANDIDATES
+  candidates = candidates[:PYRAMID_CANDIDATES]
+
+  h, w = template.height, template.width
+  pad = int(2 / scale) + 2
+  found = []
+  for x, y in candidates:
+    left, top = max(int(x / scale) - pad, 0), max(int(y / scale) - pad, 0)
+    window = screen[top:int(y / scale) + pad + h, left:int(x / scale) + pad + w]
+    if window.shape[0] < h or window.shape[1] < w:
+      continue
+    _, score, _, loc = cv2.minMaxLoc(cv2.matchTemplate(window, image, cv2.TM_CCOEFF_NORMED))
+    position = (left + loc[0], top + loc[1])
+    if score >= threshold and all(abs(position[0] - fx) > 5 or abs(position[1] - fy) > 5 for fx, fy, _ in found):
+      found.append((position[0], position[1], score))
+
+  if PYRAMID_FALLBACK and (truncated or (not found and coarse.max() >= threshold - PYRAMID_FALLBACK_MARGIN)):
+    return None
+  return sorted(found, key=lambda match: -match[2])
+
+
+def match_templates(template_paths, region=None, threshold=0.85):
+  """
+  Match several templates against one read of a (left, top, right, bottom) region.
+  Every location is given to the template scoring best there, so look-alike icons
+  are not counted twice. Returns {name: [(x, y, w, h), ...]} on the screen.
+  """
   if region:
-    screen = np.array(ImageGrab.grab(bbox=region))  # (left, top, right, bottom)
+    left, top, right, bottom = region
+    search = (left, top, right - left, bottom - top)
   else:
-    screen = np.array(ImageGrab.grab())
-  screen = cv2.cvtColor(screen, cv2.COLOR_RGB2BGR)
-
-  # Load template
-  template = cv2.imread(template_path, cv2.IMREAD_COLOR)  # safe default
-  if template.shape[2] == 4:
-    template = cv2.cvtColor(template, cv2.COLOR_BGRA2BGR)
-  result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
-  loc = np.where(result >= threshold)
-
-  h, w = template.shape[:2]
-  boxes = [(x, y, w, h) for (x, y) in zip(*loc[::-1])]
-
-  return deduplicate_boxes(boxes)
-
-
-def deduplicate_boxes(boxes, min_dist=5):
-  filtered = []
-  for x, y, w, h in boxes:
-    cx, cy = x + w // 2, y + h // 2
-    if all(abs(cx - (fx + fw // 2)) > min_dist or abs(cy - (fy + fh // 2)) > min_dist
-        for fx, fy, fw, fh in filtered):
-      filtered.append((x, y, w, h))
-  return filtered
+    search = full_screen()
+  key = ("match_templates", tuple(template_paths.items()), search, threshold)
+  return cached_result(key, search, lambda: _match_templates(template_paths, search, threshold))
+
+def _match_templates(template_paths, search, threshold):
+  # One contiguous copy of the region, shared by every template
+  screen = np.ascontiguousarray(get_region(search))
+  names = list(template_paths)
+  templates = [get_template(template_paths[name]) for name in names]
+
+  def score(template):
+    if screen.shape[0] < template.height or screen.shape[1] < template.width:
+      return None
+    return cv2.matchTemplate(screen, template.color, cv2.TM_CCOEFF_NORMED)
+
+  # One score map per template, computed side by side and padded to a common size so they stack
+  height = screen.shape[0] - min(t.height for t in templates) + 1
+  width = screen.shape[1] - min(t.width for t in templates) + 1
+  scores = np.full((len(templates), height, width), -1.0, dtype=np.float32)
+  for i, result in enumerate(parallel_map(score, templates)):
+    if result is not None:
+      scores[i, :result.shape[0], :result.shape[1]] = result
+
+  best = scores.argmax(axis=0)
+
+  matches = {}
+  for i, (name, template) in enumerate(zip(names, templates)):
+    own = np.where(best == i, scores[i], -1.0)
+    boxes = peak_boxes(own, threshold, template.width, template.height)
+    matches[name] = [(search[0] + x, search[1] + y, w, h) for x, y, w, h in boxes]
+  return matches
+
+def find_peaks(result, threshold, min_dist=5, max_peaks=MAX_PEAKS):
+  """
+  Strongest points of a match-result matrix above threshold, no two within
+  min_dist of each other on both axes. Returns (xs, ys) in raster order.
+  Cost grows with the matrix size, not with how many pixels pass the threshold:
+  at most max_peaks local maxima go into the final suppression.
+  """
+  ys, xs = np.nonzero(result >= threshold)
+  if len(xs) == 0:
+    return xs, ys
+
+  # Local maxima, only looked for around the candidates
+  top, left = max(ys.min() - min_dist, 0), max(xs.min() - min_dist, 0)
+  window = result[top:ys.max() + min_dist + 1, left:xs.max() + min_dist + 1]
+  size = 2 * min_dist + 1
+  dilated = cv2.dilate(window, np.ones((size, size), np.uint8))
+  peak = window[ys - top, xs - left] >= dilated[ys - top, xs - left]
+  ys, xs = ys[peak], xs[peak]
+  scores = result[ys, xs]
+
+  # Plateaus leave several equal maxima close together, keep the best one per grid cell
+  cell = min_dist + 1
+  cell_ids = (ys // cell) * (result.shape[1] // cell + 1) + xs // cell
+  order = np.lexsort((-scores, cell_ids))
+  first = np.ones(len(order), dtype=bool)
+  first[1:] = cell_ids[order][1:] != cell_ids[order][:-1]
+  candidates = order[first]
+  candidates = candidates[np.argsort(-scores[candidates], kind="stable")][:max_peaks]
+
+  # Only neighbouring cells can still clash, settle them strongest first. Squares of
+  # side min_dist + 1 overlap exactly when two points are within min_dist on both axes.
+  # NMSBoxes wants positive scores, correlation scores are shifted from [-1, 1] to [0, 2].
+  squares = np.stack([xs[candidates], ys[candidates], np.full(len(candidates), cell), np.full(len(candidates), cell)], axis=1)
+  picked = cv2.dnn.NMSBoxes(squares.tolist(), (scores[candidates] + 1.0).tolist(), 0.0, 0.0)
+  kept = candidates[np.asarray(picked, dtype=np.intp).reshape(-1)]
+  kept = kept[np.lexsort((xs[kept], ys[kept]))]
+  return xs[kept], ys[kept]
+
+def peak_boxes(result, threshold, width, height, min_dist=5):
+  """Boxes (x, y, w, h) for the peaks of a match-result matrix"""
+  xs, ys = find_peaks(result, threshold, min_dist)
+  return [(int(x), int(y), width, height) for x, y in zip(xs, ys)]
+
+def _locate_in(template, search, confidence, grayscale):
+  return match_box(get_region(search), search, template, confidence, grayscale)
+
+def match_box(screen, search, template, confidence, grayscale=False):
+  """
+  Best match of a template in a crop taken at search (left, top, width, height).
+  Touches no shared state, so it can run on worker threads.
+  """
+  if grayscale:
+    screen = cv2.cvtColor(screen, cv2.COLOR_BGR2GRAY)
+  h, w = template.height, template.width
+  if screen.shape[0] < h or screen.shape[1] < w:
+    return None
+  if use_pyramid(search, template):
+    found = pyramid_match(screen, template, confidence, grayscale)
+    if found is not None:
+      return Box(search[0] + found[0][0], search[1] + found[0][1], w, h) if found else None
+  result = cv2.matchTemplate(screen, template.image(grayscale), cv2.TM_CCOEFF_NORMED)
+  _, max_val, _, max_loc = cv2.minMaxLoc(result)
+  if max_val >= confidence:
+    return Box(search[0] + max_loc[0], search[1] + max_loc[1], w, h)
+  return None
+
+def locate(template_path, confidence=0.8, min_search_time=0, region=None, grayscale=False):
+  """
+  Find a template on the shared frame, stand-in for pyautogui.locateOnScreen.
+  region is (left, top, width, height), returns the best Box or None.
+  Without a region, the spots where the template was found before are searched
+  first and the whole screen only on a miss.
+  Live sources keep retrying on fresh frames for min_search_time seconds.
+  """
+  template = get_template(template_path)
+
+  def find(search):
+    key = ("locate", template_path, search, confidence, grayscale)
+    return cached_result(key, search, lambda: _locate_in(template, search, confidence, grayscale))
+
+  def find_anywhere():
+    for search in prior_regions(template_path, template.width, template.height):
+      box = find(search)
+      if box:
+        count_prior(True)
+        return box
+    count_prior(False)
+    box = find(full_screen())
+    if box:
+      remember(template_path, box.left, box.top)
+    return box
+
+  deadline = time.time() + min_search_time
+  while True:
+    box = find(region) if region else find_anywhere()
+    if box or not get_frame_source().realtime or time.time() >= deadline:
+      return box
+    invalidate_frame()
+
+def locate_all(template_paths, confidence=0.8, min_search_time=0, region=None, grayscale=False):
+  """
+  locate for several templates at once, {name: Box or None}.
+  Every search runs in parallel on one frame: known spots first, then the whole
+  screen (or region) for the templates that were not there.
+  """
+  boxes = dict.fromkeys(template_paths)
+  deadline = time.time() + min_search_time
+  while True:
+    missing = [name for name, box in boxes.items() if box is None]
+    if region is None:
+      jobs = []
+      for name in missing:
+        template = get_template(template_paths[name])
+        for i, search in enumerate(prior_regions(template_paths[name], template.width, template.height)):
+          jobs.append(MatchJob((name, i), template_paths[name], search, confidence, grayscale))
+      found = match_batch(jobs)
+      for (name, _), box in found.items():  # in job order, most recent spot first
+        if box and boxes[name] is None:
+          boxes[name] = box
+      for name in missing:
+        count_prior(boxes[name] is not None)
+
+    search = region or full_screen()
+    missing = [name for name, box in boxes.items() if box is None]
+    found = match_batch([MatchJob(name, template_paths[name], search, confidence, grayscale) for name in missing])
+    for name, box in found.items():
+      boxes[name] = box
+      if box and region is None:
+        remember(template_paths[name], box.left, box.top)
+
+    if all(boxes.values()) or not get_frame_source().realtime or time.time() >= deadline:
+      return boxes
+    invalidate_frame()
+
+def locate_center(template_path, confidence=0.8, min_search_time=0, region=None, grayscale=False):
+  """Same as locate but returns the (x, y) center, like pyautogui.locateCenterOnScreen"""
+  box = locate(template_path, confidence, min_search_time, region, grayscale)
+  if box:
+    return (box.left + box.width // 2, box.top + box.height // 2)
+  return None
 
 def is_infirmary_active(REGION):
   screenshot = capture_region(REGION)
@@ -0,0 +1,99 @@
+from collections import namedtuple
+
+from core.matcher import MatchJob, match_batch
+from core.templates import get_template
+from core.priors import prior_regions, remember
+from core.layout import scaled, full_screen
+from utils.screenshot import refresh_frame
+from core.transitions import predict, observe, CONFIDENT
+
+Screen = namedtuple("Screen", "label buttons")
+Probe = namedtuple("Probe", "name template region confidence")
+
+# Buttons that tell the screens apart, in the order career_lobby handles them.
+# The first probe found decides the label, a None region means "anywhere".
+# Regions are in 1920x1080 coordinates.
+PROBES = [
+  Probe("event", "assets/buttons/choices/choice_1.png", (271, 398, 566, 604), 0.95),
+  Probe("inspiration", "assets/buttons/inspiration_btn.png", None, 0.8),
+  Probe("next", "assets/buttons/next_btn.png", None, 0.8),
+  Probe("cancel", "assets/buttons/cancel_btn.png", None, 0.8),
+  Probe("lobby", "assets/ui/tazuna_hint.png", None, 0.8),
+]
+
+def _search_regions(probe, full_scan):
+  if probe.region:
+    return [scaled(probe.region)]
+  if full_scan:
+    return [full_screen()]
+  template = get_template(probe.template)
+  return prior_regions(probe.template, template.width, template.height) or [full_screen()]
+
+def _run_probes(probes, full_scan):
+  """
+  Match every probe on the current frame in one batch.
+  Returns ({name: Box}, number of searches made).
+  """
+  jobs = [
+    MatchJob((probe, i), probe.template, search, probe.confidence)
+    for probe in probes
+    for i, search in enumerate(_search_regions(probe, full_scan))
+  ]
+  found = {}
+  for (probe, _), box in match_batch(jobs).items():
+    if box and probe.name not in found:
+      found[probe.name] = box
+      if probe.region is None:
+        remember(probe.template, box.left, box.top)
+  return found, len(jobs)
+
+def _search_unsure(probes, buttons):
+  """
+  Buttons without a fixed region may sit somewhere new. Every such probe that was only
+  looked for at its known spots, and would outrank the best button found, gets a
+  whole-screen search. Returns (buttons, number of extra searches).
+  """
+  rank = next((i for i, probe in enumerate(probes) if probe.name in buttons), len(probes))
+  unsure = [
+    probe for probe in probes[:rank]
+    if probe.region is None and _search_regions(probe, full_scan=False) != [full_screen()]
+  ]
+  if not unsure:
+    return buttons, 0
+  found, searches = _run_probes(unsure, full_scan=True)
+  return {**buttons, **found}, searches
+
+def classify_screen(refresh=True) -> Screen:
+  """
+  Tell which screen is showing from one frame.
+  Returns Screen(label, buttons): label is the first probe found ("unknown" if none),
+  buttons maps every probe found to its Box. When the transition model is confident
+  about the next screen, it and the probes ranked above it are tried first and the
+  probes ranked below are skipped if one of them is found.
+  """
+  if refresh:
+    refresh_frame()
+
+  # The screen that usually follows the last screen and action, and anything that
+  # would cover it, is tried first
+  first = []
+  predictions = predict()
+  if predictions and predictions[0][1] >= CONFIDENT:
+    rank = next((i for i, probe in enumerate(PROBES) if probe.name == predictions[0][0]), None)
+    if rank is not None:
+      first = PROBES[:rank + 1]
+
+  searches = 0
+  for probes in (first, PROBES[len(first):]):
+    if not probes:
+      continue
+    buttons, more = _run_probes(probes, full_scan=False)
+    buttons, extra = _search_unsure(probes, buttons)
+    searches += more + extra
+    if buttons:
+      label = next(probe.name for probe in probes if probe.name in buttons)
+      observe(label, searches, early_stop=probes is first and len(first) < len(PROBES))
+      return Screen(label, buttons)
+
+  observe("unknown", searches)
+  return Screen("unknown", {})
@@ -1,52 +1,64 @@
 import re
 
-from utils.screenshot import capture_region, enhanced_screenshot
-from core.ocr import extract_text, extract_number
-from core.recognizer import match_template
+from utils.screenshot import enhanced_screenshot, enhanced_screenshots, get_region
+from core.ocr import extract_text, extract_number, extract_batch, submit_text, submit_batch, then
+from core.recognizer import match_templates
+from core.layout import scaled, scaled_bbox
+from core.vocabulary import Vocabulary
+from core.mood import classify_mood, learn_mood
 
-from utils.constants import SUPPORT_CARD_ICON_REGION, MOOD_REGION, TURN_REGION, FAILURE_REGION, YEAR_REGION, MOOD_LIST, CRITERIA_REGION
+from utils.constants import SUPPORT_CARD_ICON_REGION, MOOD_REGION, TURN_REGION, FAILURE_REGION, YEAR_REGION, MOOD_LIST, CRITERIA_REGION, YEAR_LABELS, CRITERIA_ACHIEVED, STAT_REGIONS
+
+# OCR of the fixed fields is snapped to their known labels. Year labels differ by a
+# single word (Early/Late, the month), so a snap there needs a closer read.
+YEARS = Vocabulary(YEAR_LABELS)
+CRITERIA = Vocabulary([CRITERIA_ACHIEVED])
+YEAR_CONFIDENCE = 0.75
+CRITERIA_CONFIDENCE = 0.8
 
 # Get Stat
 def stat_state():
-  stat_regions = {
-    "spd": (310, 723, 55, 20),
-    "sta": (405, 723, 55, 20),
-    "pwr": (500, 723, 55, 20),
-    "guts": (595, 723, 55, 20),
-    "wit": (690, 723, 55, 20)
-  }
+  return submit_stat_state().result()
 
-  result = {}
-  for stat, region in stat_regions.items():
-    img = enhanced_screenshot(region)
-    val = extract_number(img)
-    digits = ''.join(filter(str.isdigit, val))
-    result[stat] = int(digits) if digits.isdigit() else 0
-  return result
+# Same as stat_state, the OCR part runs in the background
+def submit_stat_state():
+  images = enhanced_screenshots({stat: scaled(region) for stat, region in STAT_REGIONS.items()})
+  def parse(texts):
+    result = {}
+    for stat in STAT_REGIONS:
+      digits = ''.join(filter(str.isdigit, texts[stat]))
+      result[stat] = int(digits) if digits.isdigit() else 0
+    return result
+  return then(submit_batch([(stat, img, "number") for stat, img in images.items()]), parse)
 
-# Check support card in each training
-def check_support_card(threshold=0.8):
-  SUPPORT_ICONS = {
-    "spd": "assets/icons/support_card_type_spd.png",
-    "sta": "assets/icons/support_card_type_sta.png",
-    "pwr": "assets/icons/support_card_type_pwr.png",
-    "guts": "assets/icons/support_card_type_guts.png",
-    "wit": "assets/icons/support_card_type_wit.png",
-    "friend": "assets/icons/support_card_type_friend.png"
-  }
+SUPPORT_ICONS = {
+  "spd": "assets/icons/support_card_type_spd.png",
+  "sta": "assets/icons/support_card_type_sta.png",
+  "pwr": "assets/icons/support_card_type_pwr.png",
+  "guts": "assets/icons/support_card_type_guts.png",
+  "wit": "assets/icons/support_card_type_wit.png",
+  "friend": "assets/icons/support_card_type_friend.png"
+}
 
-  count_result = {}
+# Find support card icons in each training, one pass for every type
+def find_support_cards(threshold=0.8):
+  return match_templates(SUPPORT_ICONS, scaled_bbox(SUPPORT_CARD_ICON_REGION), threshold)
 
-  for key, icon_path in SUPPORT_ICONS.items():
-    matches = match_template(icon_path, SUPPORT_CARD_ICON_REGION, threshold)
-    count_result[key] = len(matches)
-
-  return count_result
+# Check support card in each training
+def check_support_card(threshold=0.8):
+  return {key: len(boxes) for key, boxes in find_support_cards(threshold).items()}
 
 # Get failure chance (idk how to get energy value)
 def check_failure():
-  failure = enhanced_screenshot(FAILURE_REGION)
-  failure_text = extract_text(failure).lower()
+  return submit_failure().result()
+
+# Same as check_failure, the OCR part runs in the background
+def submit_failure():
+  failure = enhanced_screenshot(scaled(FAILURE_REGION))
+  return then(submit_text(failure), parse_failure)
+
+def parse_failure(text):
+  failure_text = text.lower()
 
   if not failure_text.startswith("failure"):
     return -1
@@ -72,8 +84,17 @@ def check_failure():
 
 # Check mood
 def check_mood():
-  mood = capture_region(MOOD_REGION)
-  mood_text = extract_text(mood).upper()
+  badge = get_region(scaled(MOOD_REGION))
+  known, _ = classify_mood(badge)
+  if known is not None:
+    return known
+
+  mood = parse_mood(extract_text(badge[:, :, ::-1]))
+  learn_mood(badge, mood)
+  return mood
+
+def parse_mood(text):
+  mood_text = text.upper()
 
   for known_mood in MOOD_LIST:
     if known_mood in mood_text:
@@ -84,9 +105,10 @@ def check_mood():
 
 # Check turn
 def check_turn():
-    turn = enhanced_screenshot(TURN_REGION)
-    turn_text = extract_text(turn)
+    turn = enhanced_screenshot(scaled(TURN_REGION))
+    return parse_turn(extract_text(turn))
 
+def parse_turn(turn_text):
     if "Race Day" in turn_text:
         return "Race Day"
 
@@ -108,26 +130,59 @@ def check_turn():
 
 # Check year
 def check_current_year():
-  year = enhanced_screenshot(YEAR_REGION)
-  text = extract_text(year)
+  year = enhanced_screenshot(scaled(YEAR_REGION))
+  return parse_year(extract_text(year))
+
+def parse_year(text):
+  label, confidence = YEARS.match(text)
+  if confidence >= YEAR_CONFIDENCE:
+    return label
+  # A near tie (Jun or Jul?) is kept as read rather than guessed
+  print(f"[WARNING] Year not recognized: {text} (closest {label}, confidence {confidence:.2f})")
   return text
 
 # Check criteria
 def check_criteria():
-  img = enhanced_screenshot(CRITERIA_REGION)
-  text = extract_text(img)
-  return text
+  img = enhanced_screenshot(scaled(CRITERIA_REGION))
+  return parse_criteria(extract_text(img))
+
+def parse_criteria(text):
+  # Anything but the achieved banner is the goal still to meet, kept as read
+  return CRITERIA.snap(text, min_confidence=CRITERIA_CONFIDENCE)
+
+# Mood, turn, year and criteria of the lobby, read in one OCR batch
+def read_lobby_state():
+  badge = get_region(scaled(MOOD_REGION))
+  mood, _ = classify_mood(badge)
+  crops = [
+    ("year", enhanced_screenshot(scaled(YEAR_REGION))),
+    ("criteria", enhanced_screenshot(scaled(CRITERIA_REGION))),
+    ("turn", enhanced_screenshot(scaled(TURN_REGION))),
+  ]
+  if mood is None:
+    crops.append(("mood", badge[:, :, ::-1]))
+
+  texts = extract_batch(crops)
+  if mood is None:
+    mood = parse_mood(texts["mood"])
+    learn_mood(badge, mood)
+  return {
+    "mood": mood,
+    "turn": parse_turn(texts["turn"]),
+    "year": parse_year(texts["year"]),
+    "criteria": parse_criteria(texts["criteria"]),
+  }
 
 # Check skill points
 def check_skill_points():
   from utils.constants import SKILL_PTS_REGION
-  img = enhanced_screenshot(SKILL_PTS_REGION)
+  img = enhanced_screenshot(scaled(SKILL_PTS_REGION))
   number = extract_number(img)
   digits = ''.join(filter(str.isdigit, number))
   return int(digits) if digits.isdigit() else 0
 
 # Check skill points and handle cap
-def check_skill_points_cap():
+def check_skill_points_cap(current_skill_points=None):
   import json
   from pymsgbox import confirm
   
@@ -136,7 +191,8 @@ def check_skill_points_cap():
     config = json.load(file)
   
   skill_point_cap = config.get("skill_point_cap", 100)
-  current_skill_points = check_skill_points()
+  if current_skill_points is None:
+    current_skill_points = check_skill_points()
   
   print(f"[INFO] Current skill points: {current_skill_points}, Cap: {skill_point_cap}")
   
@@ -153,4 +209,79 @@ def check_skill_points_cap():
     print("[INFO] Automation continuing (player may or may not have spent skill points)")
     return True
   
-  return True
\ No newline at end of file
+  return True
+
+_UNSET = object()
+
+class GameState:
+  """
+  What has been read of the current turn. Each field is read the first time it is
+  asked for and kept until invalidate(), after an action that changes the game.
+  training is the exception: reading it means pressing every training icon, so
+  career_lobby does that on the training screen and stores the result.
+  """
+  __slots__ = ("_mood", "_turn", "_year", "_criteria", "_stats", "_skill_points", "_training")
+
+  def __init__(self):
+    self.invalidate()
+
+  def invalidate(self):
+    for slot in GameState.__slots__:
+      setattr(self, slot, _UNSET)
+
+  def _read_lobby(self):
+    # The four lobby fields share one OCR batch, asking for one reads them all
+    lobby = read_lobby_state()
+    self._mood, self._turn = lobby["mood"], lobby["turn"]
+    self._year, self._criteria = lobby["year"], lobby["criteria"]
+
+  @property
+  def mood(self):
+    if self._mood is _UNSET:
+      self._read_lobby()
+    return self._mood
+
+  @property
+  def turn(self):
+    if self._turn is _UNSET:
+      self._read_lobby()
+    return self._turn
+
+  @property
+  def year(self):
+    if self._year is _UNSET:
+      self._read_lobby()
+    return self._year
+
+  @property
+  def criteria(self):
+    if self._criteria is _UNSET:
+      self._read_lobby()
+    return self._criteria
+
+  @property
+  def stats(self):
+    if self._stats is _UNSET:
+      self._stats = stat_state()
+    return self._stats
+
+  @property
+  def skill_points(self):
+    if self._skill_points is _UNSET:
+      self._skill_points = check_skill_points()
+    return self._skill_points
+
+  @property
+  def training(self):
+    """Support cards and failure chance of every training, None until career_lobby sets it"""
+    return None if self._training is _UNSET else self._training
+
+  @training.setter
+  def training(self, results):
+    self._training = results
+
+_game_state = GameState()
+
+def game_state() -> GameState:
+  """The GameState of the turn being played"""
+  return _game_state
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import time
+import cv2
+import numpy as np
+
+TEMPLATE_DIRS = ["assets/buttons", "assets/icons", "assets/ui"]
+
+class Template:
+  """An asset image loaded once with everything the matchers need"""
+  __slots__ = ("path", "color", "gray", "width", "height", "_scaled")
+
+  def __init__(self, path, scale=1.0, color=None):
+    if color is None:
+      color = cv2.imread(path, cv2.IMREAD_COLOR)
+      if color is None:
+        raise FileNotFoundError(path)
+      if scale != 1.0:
+        # Assets are cut from a 1920x1080 screen, resize them to the current one
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+        color = cv2.resize(color, None, fx=scale, fy=scale, interpolation=interpolation)
+    self.path = path
+    self.color = color
+    self.gray = cv2.cvtColor(color, cv2.COLOR_BGR2GRAY)
+    self.height, self.width = color.shape[:2]
+    self._scaled = {}
+
+  def image(self, grayscale=False) -> np.ndarray:
+    return self.gray if grayscale else self.color
+
+  def scaled(self, scale, grayscale=False) -> np.ndarray:
+    """Downscaled copy for pyramid matching, made once per scale"""
+    key = (scale, grayscale)
+    if key not in self._scaled:
+      self._scaled[key] = cv2.resize(self.image(grayscale), None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return self._scaled[key]
+
+_bank = {}
+_scale = 1.0   # screen size relative to 1920x1080, see core.layout
+
+def _key(path) -> str:
+  return os.path.normpath(path)
+
+def set_template_scale(scale):
+  """Scale templates are loaded at from now on, the bank is emptied when it changes"""
+  global _scale
+  if scale != _scale:
+    _scale = scale
+    _bank.clear()
+
+def _asset_paths(dirs):
+  for folder in dirs:
+    for root, _, files in os.walk(folder):
+      for name in sorted(files):
+        if name.lower().endswith(".png"):
+          yield os.path.join(root, name)
+
+def asset_fingerprint(dirs=TEMPLATE_DIRS) -> str:
+  """Hash of the path, size and modification time of every PNG under the folders"""
+  h = hashlib.blake2b(digest_size=16)
+  for path in _asset_paths(dirs):
+    stat = os.stat(path)
+    h.update(f"{_key(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+  return h.hexdigest()
+
+def load_templates(dirs=TEMPLATE_DIRS, bank=None) -> int:
+  """
+  Load every PNG under the given folders into the bank, returns how many were loaded.
+  With bank, the already scaled images saved by save_template_bank are read instead
+  (0 when that file is missing or the assets changed since it was saved).
+  """
+  started = time.time()
+  if bank:
+    try:
+      with np.load(bank) as saved:
+        if str(saved["fingerprint"]) != asset_fingerprint(dirs):
+          print("[INFO] Assets changed, scaling the templates again")
+          return 0
+        paths = [str(path) for path in saved["paths"]]
+        for i, path in enumerate(paths):
+          _bank[_key(path)] = Template(path, _scale, saved[f"t{i}"])
+    except (OSError, KeyError, ValueError):
+      return 0
+    print(f"[INFO] Loaded {len(paths)} scaled templates in {(time.time() - started) * 1000:.0f} ms")
+    return len(paths)
+
+  count = 0
+  for path in _asset_paths(dirs):
+    _bank[_key(path)] = Template(path, _scale)
+    count += 1
+  print(f"[INFO] Loaded {count} templates in {(time.time() - started) * 1000:.0f} ms")
+  return count
+
+def get_template(path) -> Template:
+  """Template for an asset path, loaded on first use if it was not preloaded"""
+  key = _key(path)
+  template = _bank.get(key)
+  if template is None:
+    template = _bank[key] = Template(path, _scale)
+  return template
+
+def save_template_bank(bank, dirs=TEMPLATE_DIRS):
+  """Save the loaded (scaled) templates to one file for load_templates(bank=...)"""
+  templates = list(_bank.values())
+  try:
+    np.savez(
+      bank,
+      fingerprint=np.array(asset_fingerprint(dirs)),
+      paths=np.array([t.path for t in templates]),
+      **{f"t{i}": t.color for i, t in enumerate(templates)},
+    )
+  except OSError as e:
+    print(f"[WARNING] Failed to save template bank: {e}")
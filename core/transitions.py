@@ -0,0 +1,125 @@
+import json
+import os
+import sys
+
+from utils.recorder import annotate
+
+# P(next screen | last action, last screen), learned while running and from recorded sessions
+TRANSITIONS_FILE = "transitions.json"
+CONFIDENT = 0.6     # a predicted screen this likely is trusted as soon as its button is found
+SAVE_EVERY = 25
+
+_counts = None          # "action|screen" -> {next screen: count}
+_last_screen = None
+_last_action = None
+_unsaved = 0
+_stats = {"ticks": 0, "predicted": 0, "probes": 0, "early_stops": 0}
+
+def _key(action, screen) -> str:
+  return f"{action or ''}|{screen or ''}"
+
+def _load():
+  global _counts
+  if _counts is None:
+    try:
+      with open(TRANSITIONS_FILE, "r", encoding="utf-8") as f:
+        _counts = json.load(f)
+    except (OSError, ValueError):
+      _counts = {}
+  return _counts
+
+def save_transitions():
+  global _unsaved
+  if _counts is None:
+    return
+  tmp = TRANSITIONS_FILE + ".tmp"
+  try:
+    with open(tmp, "w", encoding="utf-8") as f:
+      json.dump(_counts, f, indent=2, sort_keys=True)
+    os.replace(tmp, TRANSITIONS_FILE)
+    _unsaved = 0
+  except OSError as e:
+    print(f"[WARNING] Failed to save transitions: {e}")
+
+def _add(action, screen, next_screen, amount=1):
+  row = _load().setdefault(_key(action, screen), {})
+  row[next_screen] = row.get(next_screen, 0) + amount
+
+def note_action(action):
+  """Remember what the bot just did, it shapes the next prediction"""
+  global _last_action
+  _last_action = action
+
+def predict() -> list:
+  """[(screen, probability), ...] most likely first, empty when nothing was learned yet"""
+  counts = _load()
+  row = counts.get(_key(_last_action, _last_screen))
+  if not row and _last_action:
+    # Never seen this action here, what usually follows the screen will do
+    row = counts.get(_key(None, _last_screen))
+  if not row:
+    return []
+  total = sum(row.values())
+  return sorted(((screen, n / total) for screen, n in row.items()), key=lambda p: -p[1])
+
+def observe(screen, probes, early_stop=False):
+  """Learn from the screen that was found and count how many probes it took"""
+  global _last_screen, _last_action, _unsaved
+  predictions = predict()
+  _stats["ticks"] += 1
+  _stats["probes"] += probes
+  if early_stop:
+    _stats["early_stops"] += 1
+  if predictions and predictions[0][0] == screen:
+    _stats["predicted"] += 1
+
+  _add(_last_action, _last_screen, screen)
+  # Recorded sessions replay exactly what was learned here, see seed_from_sessions
+  annotate(classified=screen)
+  _last_screen = screen
+  _last_action = None
+  _unsaved += 1
+  if _unsaved >= SAVE_EVERY:
+    save_transitions()
+
+def transition_stats() -> dict:
+  ticks = _stats["ticks"]
+  return dict(
+    _stats,
+    hit_rate=_stats["predicted"] / ticks if ticks else 0.0,
+    probes_per_tick=_stats["probes"] / ticks if ticks else 0.0,
+  )
+
+def seed_from_sessions(root="sessions") -> int:
+  """
+  Add every classified screen of the recorded sessions (ticks.jsonl) to the table,
+  with the actions taken in between, the same way observe() learns them live.
+  """
+  added = 0
+  for name in sorted(os.listdir(root)):
+    path = os.path.join(root, name, "ticks.jsonl")
+    if not os.path.exists(path):
+      continue
+    screen, action = None, None
+    with open(path, "r", encoding="utf-8") as f:
+      for line in f:
+        if not line.strip():
+          continue
+        tick = json.loads(line)
+        if "classified" in tick:
+          _add(action, screen, tick["classified"])
+          screen, action = tick["classified"], None
+          added += 1
+        if "action" in tick:
+          action = tick["action"]
+  return added
+
+if __name__ == "__main__":
+  root = sys.argv[1] if len(sys.argv) > 1 else "sessions"
+  print(f"[INFO] Seeded {seed_from_sessions(root)} transitions from {root}")
+  save_transitions()
+  for key, row in sorted(_load().items()):
+    total = sum(row.values())
+    action, screen = key.split("|")
+    likely = ", ".join(f"{s} {n / total:.0%}" for s, n in sorted(row.items(), key=lambda p: -p[1]))
+    print(f"{screen or '-':>12} after {action or '-':<14} -> {likely}")
@@ -0,0 +1,96 @@
+import re
+import numpy as np
+
+# OCR text snapped to the closest label of a small, fixed set.
+# Trigrams shortlist the candidates, edit distance picks and scores the winner.
+SHORTLIST = 5
+MIN_CONFIDENCE = 0.6
+MIN_MARGIN = 0.05     # a runner-up scoring closer than this makes the winner a guess
+MEMO_ENTRIES = 1024
+
+def normalize(text) -> str:
+  return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+def trigrams(text) -> set:
+  padded = f"  {text} "
+  return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a, b) -> int:
+  """Levenshtein distance, one numpy row per character of a"""
+  if not a or not b:
+    return max(len(a), len(b))
+  row = np.arange(len(b) + 1)
+  chars = np.array(list(b))
+  for i, char in enumerate(a, 1):
+    substitute = row[:-1] + (chars != char)
+    delete = row[1:] + 1
+    new = np.empty_like(row)
+    new[0] = i
+    new[1:] = np.minimum(substitute, delete)
+    # Insertions chain along the row: new[j] = min(new[j], new[j - 1] + 1)
+    new = np.minimum.accumulate(new - np.arange(len(new))) + np.arange(len(new))
+    row = new
+  return int(row[-1])
+
+class Vocabulary:
+  """A fixed set of labels, indexed once for fuzzy lookups"""
+  __slots__ = ("labels", "_normalized", "_index", "_sizes", "_memo")
+
+  def __init__(self, labels):
+    self.labels = list(dict.fromkeys(labels))
+    self._normalized = [normalize(label) for label in self.labels]
+    self._index = {}   # trigram -> indices of the labels containing it
+    self._sizes = np.zeros(len(self.labels), dtype=np.int32)
+    for i, text in enumerate(self._normalized):
+      grams = trigrams(text)
+      self._sizes[i] = len(grams)
+      for gram in grams:
+        self._index.setdefault(gram, []).append(i)
+    self._index = {gram: np.array(ids, dtype=np.intp) for gram, ids in self._index.items()}
+    self._memo = {}    # the same few misreads come back every turn
+
+  def match(self, text):
+    """
+    (label, confidence) of the closest label, (None, 0.0) if nothing is close at all.
+    The confidence drops towards 0 when another label is nearly as close.
+    """
+    if text not in self._memo:
+      if len(self._memo) >= MEMO_ENTRIES:
+        self._memo.clear()
+      self._memo[text] = self._match(text)
+    return self._memo[text]
+
+  def _match(self, text):
+    query = normalize(text)
+    if not query or not self.labels:
+      return None, 0.0
+    grams = trigrams(query)
+    shared = np.zeros(len(self.labels), dtype=np.int32)
+    for gram in grams:
+      ids = self._index.get(gram)
+      if ids is not None:
+        shared[ids] += 1
+    if not shared.any():
+      return None, 0.0
+
+    # Dice overlap of trigrams shortlists, edit distance decides
+    dice = 2 * shared / (self._sizes + len(grams))
+    shortlist = np.argsort(-dice, kind="stable")[:SHORTLIST]
+    scores = {}   # normalized label -> (score, label), labels that read alike count once
+    for i in shortlist:
+      if shared[i] == 0:
+        break
+      label = self._normalized[i]
+      score = 1 - edit_distance(query, label) / max(len(query), len(label))
+      if score > scores.get(label, (-1.0, None))[0]:
+        scores[label] = (score, self.labels[i])
+    ranked = sorted(scores.values(), key=lambda entry: -entry[0])
+    confidence, best = ranked[0]
+    # "Late Jui" is as close to Jun as to Jul, a near tie is not trusted
+    runner_up = ranked[1][0] if len(ranked) > 1 else 0.0
+    return best, confidence * min(1.0, (confidence - runner_up) / MIN_MARGIN)
+
+  def snap(self, text, min_confidence=MIN_CONFIDENCE) -> str:
+    """The closest label if it is close enough, otherwise the text as read"""
+    label, confidence = self.match(text)
+    return label if confidence >= min_confidence else text
@@ -1,7 +1,15 @@
 import time
+import json
 import pygetwindow as gw
 
 from core.execute import career_lobby
+from utils.capture import start_capture
+from utils.recorder import start_recording, stop_recording
+from core.layout import apply_layout
+from core.ocr import warm_up, stop_ocr_workers
+from core.ocr_cache import save_ocr_cache, ocr_cache_stats
+from core.transitions import save_transitions, transition_stats
+from core.mood import save_mood_colors
 
 def focus_umamusume():
   windows = gw.getWindowsWithTitle("Umamusume")
@@ -16,9 +24,31 @@ def focus_umamusume():
 
 def main():
   print("Uma Auto!")
+  warm_up()  # OCR loads while the window is focused and templates load
   focus_umamusume()
-  
-  career_lobby()
+  apply_layout()
+
+  with open("config.json", "r", encoding="utf-8") as file:
+    config = json.load(file)
+
+  if config.get("background_capture", False):
+    start_capture(fps=config.get("capture_fps", 10))
+
+  if config.get("record_session", False):
+    start_recording(config.get("record_dir", "sessions"))
+
+  try:
+    career_lobby()
+  finally:
+    stop_recording()
+    stop_ocr_workers()
+    save_transitions()
+    save_mood_colors()
+    stats = transition_stats()
+    print(f"[INFO] Screen predictions: {stats['hit_rate']:.0%} right, {stats['probes_per_tick']:.1f} probes per tick")
+    save_ocr_cache()
+    stats = ocr_cache_stats()
+    print(f"[INFO] OCR cache: {stats['hit_rate']:.0%} of reads skipped ({stats['disk_hits']} from disk)")
 
 if __name__ == "__main__":
   main()
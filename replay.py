@@ -0,0 +1,96 @@
+import argparse
+import os
+import time
+
+from utils.frame_source import DirectoryFrameSource, RecordedFrameSource, set_frame_source
+from utils.screenshot import refresh_frame
+from utils.change_detector import change_stats
+from core.priors import prior_stats
+from core.transitions import transition_stats
+from core.layout import get_layout
+
+def build_source(path, realtime):
+  if os.path.isdir(path) and any(os.path.exists(os.path.join(path, f)) for f in ("index.bin", "index.json")):
+    source = RecordedFrameSource(path, realtime=realtime)
+    if source.reader and not source.reader.complete:
+      print(f"[WARNING] {path} was not closed cleanly, replaying its {len(source.reader)} complete frames")
+    return source
+  return DirectoryFrameSource(path, loop=False)
+
+def get_readers(skip_ocr):
+  from core.recognizer import locate_center
+  from core.state import check_support_card
+  from core.screen import classify_screen
+  from utils.event_recognizer import is_event_screen
+
+  readers = {
+    "screen": lambda: classify_screen(refresh=False),
+    "event_screen": is_event_screen,
+    "tazuna_hint": lambda: locate_center("assets/ui/tazuna_hint.png", confidence=0.8),
+    "support_card": check_support_card,
+  }
+  if not skip_ocr:
+    from core.state import check_mood, check_turn, check_current_year, check_criteria, stat_state, check_failure, read_lobby_state
+    readers.update({
+      "mood": check_mood,
+      "turn": check_turn,
+      "year": check_current_year,
+      "criteria": check_criteria,
+      "stats": stat_state,
+      "lobby": read_lobby_state,
+      "failure": check_failure,
+    })
+  return readers
+
+def replay(path, repeat=1, realtime=False, skip_ocr=False, verbose=False):
+  readers = get_readers(skip_ocr)
+  if not skip_ocr:
+    from core.ocr import warm_up
+    warm_up()
+  timings = {name: [] for name in readers}
+  frames = 0
+  started = time.perf_counter()
+
+  for _ in range(repeat):
+    set_frame_source(build_source(path, realtime))
+    while True:
+      try:
+        refresh_frame()
+      except EOFError:
+        break
+      frames += 1
+      get_layout()  # measured once per resolution, before the readers are timed
+      for name, reader in readers.items():
+        t = time.perf_counter()
+        value = reader()
+        timings[name].append(time.perf_counter() - t)
+        if verbose:
+          print(f"[{frames}] {name}: {value}")
+
+  elapsed = time.perf_counter() - started
+  print(f"\nReplayed {frames} frames in {elapsed:.2f}s ({frames / elapsed if elapsed else 0:.1f} frames/s)")
+  for name, values in timings.items():
+    if values:
+      print(f"{name:>14}: avg {sum(values) / len(values) * 1000:8.2f} ms, max {max(values) * 1000:8.2f} ms")
+
+  stats = change_stats()
+  print(f"Unchanged-region cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})")
+  stats = prior_stats()
+  print(f"Layout priors: {stats['prior_hits']} found at a known spot, {stats['full_searches']} full searches ({stats['hit_rate']:.0%})")
+  if not skip_ocr:
+    from core.ocr_cache import ocr_cache_stats
+    stats = ocr_cache_stats()
+    print(f"OCR cache: {stats['hits']} hits, {stats['disk_hits']} from disk, {stats['misses']} reads ({stats['hit_rate']:.0%})")
+  stats = transition_stats()
+  print(f"Screen predictions: {stats['hit_rate']:.0%} right, {stats['probes_per_tick']:.1f} probes per tick, {stats['early_stops']} early stops")
+  set_frame_source(None)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Replay captured frames through the perception stack without the game")
+  parser.add_argument("path", nargs="?", default="screenshot.png", help="PNG file, folder of PNGs or recorded session folder")
+  parser.add_argument("--repeat", type=int, default=1, help="how many times to replay the frames")
+  parser.add_argument("--realtime", action="store_true", help="keep the recorded pacing of a session")
+  parser.add_argument("--skip-ocr", action="store_true", help="only time template matching")
+  parser.add_argument("--verbose", action="store_true", help="print every reader result")
+  args = parser.parse_args()
+  replay(args.path, args.repeat, args.realtime, args.skip_ocr, args.verbose)
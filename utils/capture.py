@@ -0,0 +1,130 @@
+import threading
+import time
+import mss
+import numpy as np
+
+class CaptureService:
+  """
+  Background screen grabber that keeps the last few frames in a ring buffer.
+  One mss session lives for the whole run, so readers never wait on a grab.
+  A frame slot is reused after size / fps seconds, copy it if you keep it longer.
+  """
+
+  def __init__(self, fps=10, size=4):
+    self.fps = fps
+    self.size = size
+    self.origin = (0, 0)
+    self._slots = None
+    self._thumbs = None
+    self._times = [0.0] * size
+    self._head = -1   # index of the newest slot, -1 until the first grab
+    self._cond = threading.Condition()
+    self._running = False
+    self._thread = None
+
+  def start(self):
+    if self._running:
+      return self
+    self._running = True
+    self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+    self._thread.start()
+    return self
+
+  def stop(self):
+    self._running = False
+    if self._thread:
+      self._thread.join(timeout=1)
+      self._thread = None
+
+  def is_running(self) -> bool:
+    return self._running
+
+  def _run(self):
+    interval = 1.0 / self.fps
+    with mss.mss() as sct:
+      monitor = sct.monitors[1]
+      self.origin = (monitor["left"], monitor["top"])
+      while self._running:
+        started = time.time()
+        img = np.asarray(sct.grab(monitor))
+        self._store(img, started)
+        elapsed = time.time() - started
+        if elapsed < interval:
+          time.sleep(interval - elapsed)
+
+  def _store(self, img, timestamp):
+    if self._slots is None or self._slots.shape[1:] != img.shape:
+      self._slots = np.empty((self.size,) + img.shape, dtype=np.uint8)
+      self._thumbs = np.empty((self.size,) + img[::16, ::16, :3].shape, dtype=np.int16)
+    index = (self._head + 1) % self.size
+    np.copyto(self._slots[index], img)
+    self._thumbs[index] = img[::16, ::16, :3]
+    with self._cond:
+      self._times[index] = timestamp
+      self._head = index
+      self._cond.notify_all()
+
+  def latest(self):
+    """Return (timestamp, frame) of the newest frame, or (0.0, None) before the first grab"""
+    with self._cond:
+      if self._head < 0:
+        return 0.0, None
+      return self._times[self._head], self._slots[self._head]
+
+  def newer_than(self, timestamp, timeout=1.0):
+    """Block until a frame grabbed after timestamp exists, return (timestamp, frame) or (0.0, None)"""
+    deadline = time.time() + timeout
+    with self._cond:
+      while self._head < 0 or self._times[self._head] <= timestamp:
+        remaining = deadline - time.time()
+        if remaining <= 0 or not self._running:
+          return 0.0, None
+        self._cond.wait(remaining)
+      # Oldest frame that is still newer than timestamp
+      for offset in range(self.size - 1, -1, -1):
+        index = (self._head - offset) % self.size
+        if self._times[index] > timestamp:
+          return self._times[index], self._slots[index]
+    return 0.0, None
+
+  def stable(self, duration_ms=200, tolerance=4, timeout=3.0):
+    """
+    Block until the screen stayed the same for duration_ms, judged on a 1/16
+    thumbnail so small noise under tolerance does not count as a change.
+    Returns (timestamp, frame) or (0.0, None) on timeout.
+    """
+    deadline = time.time() + timeout
+    last_change = time.time()
+    last_seen = 0.0
+    reference = None
+    while time.time() < deadline:
+      timestamp, _ = self.newer_than(last_seen, timeout=deadline - time.time())
+      if not timestamp:
+        break
+      with self._cond:
+        index = self._head
+        last_seen = self._times[index]
+        thumb = self._thumbs[index].copy()
+      if reference is None or np.abs(thumb - reference).max() > tolerance:
+        reference = thumb
+        last_change = last_seen
+      elif (last_seen - last_change) * 1000 >= duration_ms:
+        return self.latest()
+    return 0.0, None
+
+_service = None
+
+def start_capture(fps=10, size=4) -> CaptureService:
+  global _service
+  if _service is None:
+    _service = CaptureService(fps, size)
+  return _service.start()
+
+def stop_capture():
+  global _service
+  if _service:
+    _service.stop()
+    _service = None
+
+def get_capture_service():
+  return _service if _service and _service.is_running() else None
@@ -0,0 +1,77 @@
+import zlib
+import numpy as np
+
+from utils.screenshot import get_region, get_frame_serial
+
+# Every second pixel on both axes is enough to notice any UI change
+SAMPLE_STEP = 2
+
+_signatures = {}       # region -> signature, for the current frame only
+_signature_serial = -1
+_results = {}          # key -> (region, signature, result)
+_stats = {"hits": 0, "misses": 0}
+
+def region_signature(region, crop=None) -> int:
+  """
+  Checksum of a downsampled (left, top, width, height) region of the shared frame.
+  crop is that region of the current frame when the caller already cut it.
+  """
+  global _signature_serial
+  if crop is None:
+    crop = get_region(region)
+  serial = get_frame_serial()
+  if serial != _signature_serial:
+    _signatures.clear()
+    _signature_serial = serial
+  if region not in _signatures:
+    sample = np.ascontiguousarray(crop[::SAMPLE_STEP, ::SAMPLE_STEP])
+    _signatures[region] = zlib.crc32(sample)
+  return _signatures[region]
+
+_MISSING = object()
+
+def lookup(key, region, crop=None):
+  """
+  (signature, result) of the region in the current frame, result being the last one
+  stored under key if the region did not change since, otherwise _MISSING.
+  """
+  signature = region_signature(region, crop)
+  cached = _results.get(key)
+  if cached and cached[0] == region and cached[1] == signature:
+    _stats["hits"] += 1
+    return signature, cached[2]
+  _stats["misses"] += 1
+  return signature, _MISSING
+
+def store(key, region, signature, result):
+  """Remember a result for the region as it was when lookup took its signature"""
+  _results[key] = (region, signature, result)
+
+def is_missing(result) -> bool:
+  return result is _MISSING
+
+def cached_result(key, region, compute):
+  """
+  Return the last result stored under key while the region's pixels did not change,
+  otherwise run compute() and remember its result.
+  """
+  signature, result = lookup(key, region)
+  if result is _MISSING:
+    serial = get_frame_serial()
+    result = compute()
+    # A compute that outlived the frame may have read a newer one, its result
+    # matches neither signature and is not kept
+    if get_frame_serial() == serial:
+      store(key, region, signature, result)
+  return result
+
+def forget(key=None):
+  """Drop one cached result, or all of them"""
+  if key is None:
+    _results.clear()
+  else:
+    _results.pop(key, None)
+
+def change_stats() -> dict:
+  total = _stats["hits"] + _stats["misses"]
+  return dict(_stats, hit_rate=_stats["hits"] / total if total else 0.0)
@@ -5,4 +5,20 @@ FAILURE_REGION=(250, 770, 855 - 295, 835 - 770)
 YEAR_REGION=(255, 35, 420 - 255, 60 - 35)
 CRITERIA_REGION=(455, 85, 625 - 455, 115 - 85)
 SKILL_PTS_REGION=(755, 777, 76, 40)
-MOOD_LIST = ["AWFUL", "BAD", "NORMAL", "GOOD", "GREAT", "UNKNOWN"]
\ No newline at end of file
+STAT_REGIONS = {
+  "spd": (310, 723, 55, 20),
+  "sta": (405, 723, 55, 20),
+  "pwr": (500, 723, 55, 20),
+  "guts": (595, 723, 55, 20),
+  "wit": (690, 723, 55, 20)
+}
+MOOD_LIST = ["AWFUL", "BAD", "NORMAL", "GOOD", "GREAT", "UNKNOWN"]
+# Every label the year field can show, OCR of it is snapped to one of these
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+YEAR_LABELS = ["Junior Year Pre-Debut", "Finale Season"] + [
+  f"{year} Year {half} {month}"
+  for year in ("Junior", "Classic", "Senior")
+  for month in MONTHS
+  for half in ("Early", "Late")
+]
+CRITERIA_ACHIEVED = "Goal Achieved"
@@ -2,8 +2,10 @@ import json
 import os
 import re
 from typing import Dict, Tuple, Optional
-from core.ocr import extract_text
+from core.ocr import submit_text
 from utils.screenshot import enhanced_screenshot
+from core.layout import scaled
+from core.vocabulary import Vocabulary
 
 # Region where event text appears in the game window
 EVENT_TEXT_REGION = (243, 196, 382, 72)  # Coordinates found using region selector tool
@@ -74,9 +76,15 @@ def normalize_event_text(text: str) -> str:
 
 def get_event_text() -> str:
     """Capture and extract text from the event screen"""
-    event_img = enhanced_screenshot(EVENT_TEXT_REGION)
-    text = extract_text(event_img)
-    
+    return clean_event_text(submit_event_text().result())
+
+def submit_event_text():
+    """Start reading the event text, returns a Future of the raw OCR text"""
+    event_img = enhanced_screenshot(scaled(EVENT_TEXT_REGION))
+    return submit_text(event_img)
+
+def clean_event_text(text: str) -> str:
+    """Reject and fix up raw OCR text of the event region"""
     # Filter out obviously wrong text
     invalid_keywords = [
         "Windows", "PowerShell", "Microsoft", "Python",
@@ -132,6 +140,20 @@ def load_support_events() -> Dict:
         print(f"[WARNING] Failed to load support events: {str(e)}")
         return {}
 
+# Event titles of the databases, indexed once per character for fuzzy lookups
+EVENT_CONFIDENCE = 0.8
+_event_titles = {}  # character -> (Vocabulary, {title: choices})
+
+def event_titles(character_name, char_events, common_events, support_events) -> Tuple[Vocabulary, Dict]:
+    """Every title the character can see, the first database holding a title wins as in exact matching"""
+    if character_name not in _event_titles:
+        titles = {}
+        for events in [char_events.get(character_name, {}), common_events, *support_events.values()]:
+            for event_name, choices in events.items():
+                titles.setdefault(event_name, choices)
+        _event_titles[character_name] = (Vocabulary(titles), titles)
+    return _event_titles[character_name]
+
 def extract_event_info() -> Tuple[str, list]:
     """
     Extract text from event region and match with events.
@@ -139,18 +161,20 @@ def extract_event_info() -> Tuple[str, list]:
     1. Character-specific events
     2. Common events
     3. Support card events
+    4. The closest title of any of them
     Returns event text and choice list.
     """
-    event_text = get_event_text()
-    if not event_text:
-        return "", []
-
-    # Load all event data
+    # The event databases load while the text is read
+    pending_text = submit_event_text()
     config = load_config()
     char_events = load_character_events()
     common_events = load_common_events()
     support_events = load_support_events()
 
+    event_text = clean_event_text(pending_text.result())
+    if not event_text:
+        return "", []
+
     # Clean up and normalize the detected text
     detected_text = event_text.strip()
     detected_clean = ''.join(c.lower() for c in detected_text if c.isalnum())
@@ -197,6 +221,13 @@ def extract_event_info() -> Tuple[str, list]:
                 print(f"[INFO] Found support event (normalized match) for {support_name}: {event_name}")
                 return event_name, choices
     
+    # 4. Closest known title, for OCR that is off by a few characters
+    vocabulary, titles = event_titles(character_name, char_events, common_events, support_events)
+    event_name, confidence = vocabulary.match(detected_text)
+    if confidence >= EVENT_CONFIDENCE:
+        print(f"[INFO] Found event (fuzzy match, {confidence:.2f}): {event_name}")
+        return event_name, titles[event_name]
+    
     print(f"[WARNING] No matching event found for text: {detected_text}")
     return detected_text, []
     
@@ -1,6 +1,11 @@
-import pyautogui
 import time
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
+
+from core.recognizer import locate, locate_center
+from core.matcher import MatchJob, match_batch
+from utils.screenshot import invalidate_frame
+from utils.frame_source import get_frame_source
+from core.layout import scaled, scaled_point
 
 def wait_for_user_confirmation():
     """Wait for user to press Y to continue or N to skip"""
@@ -11,6 +16,23 @@ def wait_for_user_confirmation():
         elif response == "" or response == "N":
             return False
 
+# Where each choice button sits, by total number of choices
+CHOICE_REGIONS = {
+    2: {
+        1: (254, 600, 84, 93),   # Region for choice 1 (2-choice events)
+        2: (255, 707, 83, 100),  # Region for choice 2 (2-choice events)
+    },
+    3: {
+        1: (254, 478, 84, 93),   # Region for choice 1 (3-choice events)
+        2: (255, 596, 83, 97),   # Region for choice 2 (3-choice events)
+        3: (255, 706, 83, 101),  # Region for choice 3 (3-choice events)
+    },
+}
+
+def choice_region(choice_num: int, total_choices: int = None) -> Tuple[int, int, int, int]:
+    regions = CHOICE_REGIONS[2 if total_choices == 2 else 3]
+    return scaled(regions.get(choice_num, regions[max(regions)]))
+
 def find_event_choice_button(choice_num: int, total_choices: int = None) -> Optional[Tuple[int, int]]:
     """
     Find and return the coordinates of the specified choice button
@@ -21,33 +43,22 @@ def find_event_choice_button(choice_num: int, total_choices: int = None) -> Opti
         Tuple of (x, y) coordinates or None if not found
     """
     try:
-        if total_choices == 2:
-            if choice_num == 1:
-                region = (254, 600, 84, 93)  # Region for choice 1 (2-choice events)
-            else:
-                region = (255, 707, 83, 100)  # Region for choice 2 (2-choice events)
-        else:
-            if choice_num == 1:
-                region = (254, 478, 84, 93)  # Region for choice 1 (3-choice events)
-            elif choice_num == 2:
-                region = (255, 596, 83, 97)  # Region for choice 2 (3-choice events)
-            else:
-                region = (255, 706, 83, 101)  # Region for choice 3 (3-choice events)
+        region = choice_region(choice_num, total_choices)
                 
         print(f"[DEBUG] Scanning region for choice {choice_num}: x={region[0]}, y={region[1]}, w={region[2]}, h={region[3]}")
         
         # Scan for the button in the exact region
-        button = pyautogui.locateOnScreen(
+        button = locate(
             f"assets/buttons/choices/choice_{choice_num}.png",
             confidence=0.8,  # Slightly lower confidence for better matching
-            minSearchTime=1.0,  # Longer search time
+            min_search_time=1.0,  # Longer search time
             region=region,  # Use exact region
             grayscale=True  # Use grayscale for better matching
         )
         
         if button:
             # Get the actual center of where the button was found
-            x, y = pyautogui.center(button)
+            x, y = button.left + button.width // 2, button.top + button.height // 2
             print(f"[DEBUG] Choice {choice_num} button found at: ({x}, {y})")
             return (x, y)  # Return the actual detected position
         
@@ -57,6 +68,35 @@ def find_event_choice_button(choice_num: int, total_choices: int = None) -> Opti
         print(f"[ERROR] Failed to locate choice button {choice_num}: {str(e)}")
         return None
 
+def find_event_choice_buttons(total_choices: int = None, min_search_time: float = 1.0) -> Dict[int, Optional[Tuple[int, int]]]:
+    """
+    Find every choice button of an event in one parallel pass
+    Args:
+        total_choices: Total number of choices in the event (2 or 3)
+        min_search_time: How long to keep retrying on fresh frames while a button is missing
+    Returns:
+        Dict of choice number -> (x, y) coordinates or None if not found
+    """
+    count = 2 if total_choices == 2 else 3
+    positions = {}
+    deadline = time.time() + min_search_time
+    while True:
+        jobs = [
+            MatchJob(i, f"assets/buttons/choices/choice_{i}.png", choice_region(i, count), 0.8, True)
+            for i in range(1, count + 1)
+        ]
+        try:
+            boxes = match_batch(jobs)
+        except Exception as e:
+            print(f"[ERROR] Failed to locate choice buttons: {str(e)}")
+            boxes = {}
+        for job in jobs:
+            box = boxes.get(job.name)
+            positions[job.name] = (box.left + box.width // 2, box.top + box.height // 2) if box else None
+        if all(positions.values()) or not get_frame_source().realtime or time.time() >= deadline:
+            return positions
+        invalidate_frame()
+
 last_event_state = False
 last_event_message_time = 0
 event_message_cooldown = 2  # Only print event messages every 2 seconds
@@ -71,13 +111,13 @@ def is_event_screen() -> tuple[bool, tuple[int, int] | None]:
     
     try:
         # Define the region where choice buttons should appear
-        region = (271, 398, 566, 604)  # x, y, width, height for choice button area
+        region = scaled((271, 398, 566, 604))  # x, y, width, height for choice button area
         
         # Look directly for choice 1 button as it appears in all event screens
-        choice1_button = pyautogui.locateCenterOnScreen(
+        choice1_button = locate_center(
             "assets/buttons/choices/choice_1.png",
             confidence=0.95,  # Higher confidence for more accurate matches
-            minSearchTime=0.2,
+            min_search_time=0.2,
             region=region  # Restrict search to the specified region
         )
         
@@ -110,6 +150,8 @@ def click_choice(choice_num: int, total_choices: int = None, dry_run: bool = Fal
         dry_run: If True, only scan for buttons without clicking
     Returns: True if successful, False otherwise
     """
+    import pyautogui
+    from utils import inputs
     print(f"\n[DEBUG] Starting choice button scan...")
     
     try:
@@ -140,11 +182,11 @@ def click_choice(choice_num: int, total_choices: int = None, dry_run: bool = Fal
                 click_y = 726 + 30  # center of height (61/2)
                 
         # Just verify the button is there
-        button = pyautogui.locateCenterOnScreen(
+        button = locate_center(
             f"assets/buttons/choices/choice_{choice_num}.png",
             confidence=0.8,
-            minSearchTime=0.5,
-            region=region
+            min_search_time=0.5,
+            region=scaled(region)
         )
         
         if button:
@@ -155,15 +197,19 @@ def click_choice(choice_num: int, total_choices: int = None, dry_run: bool = Fal
                 return True
                 
             try:
+                # 1920x1080 coordinates to the current screen
+                focus_x, focus_y = scaled_point(click_x, click_y - 50)
+                click_x, click_y = scaled_point(click_x, click_y)
+
                 # Focus window by clicking above the choice first
-                pyautogui.click(click_x, click_y - 50)
+                inputs.click(focus_x, focus_y)
                 time.sleep(0.3)
                 
                 # Then click the actual choice
                 pyautogui.moveTo(click_x, click_y, duration=0.2)
-                pyautogui.click()
+                inputs.click()
                 print(f"[DEBUG] Successfully clicked choice {choice_num} at position ({click_x}, {click_y})")
-                print(f"[DEBUG] Click sequence: Moved to ({click_x}, {click_y-50}) first, then clicked at ({click_x}, {click_y})")
+                print(f"[DEBUG] Click sequence: Moved to ({focus_x}, {focus_y}) first, then clicked at ({click_x}, {click_y})")
                 return True
             except Exception as e:
                 print(f"[ERROR] Failed to click choice {choice_num}: {str(e)}")
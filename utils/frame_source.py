@@ -0,0 +1,158 @@
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+import cv2
+import mss
+import numpy as np
+
+from utils.capture import get_capture_service
+from utils.recorder import SessionReader
+
+class FrameSource(ABC):
+  """
+  Where the perception stack gets its frames from.
+  grab() returns (timestamp, BGRA frame), the frame must not be kept past the next grab().
+  Sources that are not realtime replay frames as fast as they are asked for.
+  """
+  realtime = True
+  origin = (0, 0)
+
+  @abstractmethod
+  def grab(self, after=0.0):
+    """(timestamp, frame) of a frame taken after the given time when the source can tell"""
+
+  def close(self):
+    pass
+
+class LiveFrameSource(FrameSource):
+  """The real screen, through the background capture when it runs"""
+
+  def grab(self, after=0.0):
+    service = get_capture_service()
+    if service:
+      frame_time, img = service.latest()
+      if frame_time <= after:
+        frame_time, img = service.newer_than(after)
+      if img is not None:
+        self.origin = service.origin
+        return frame_time, img
+
+    with mss.mss() as sct:
+      monitor = sct.monitors[1]
+      img = np.asarray(sct.grab(monitor))
+    self.origin = (monitor["left"], monitor["top"])
+    return time.time(), img
+
+def load_frame(path) -> np.ndarray:
+  """Read an image file as a BGRA frame, the layout mss produces"""
+  img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+  if img is None:
+    raise FileNotFoundError(path)
+  if img.ndim == 2:
+    return cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA)
+  if img.shape[2] == 3:
+    return cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+  return img
+
+class DirectoryFrameSource(FrameSource):
+  """Replays PNG files in name order, a single file works too (e.g. screenshot.png)"""
+  realtime = False
+
+  def __init__(self, path, loop=True):
+    if os.path.isdir(path):
+      names = sorted(f for f in os.listdir(path) if f.lower().endswith(".png"))
+      self.paths = [os.path.join(path, f) for f in names]
+    else:
+      self.paths = [path]
+    if not self.paths:
+      raise FileNotFoundError(f"No PNG frames in {path}")
+    self.loop = loop
+    self.position = 0
+    self._cache = {}
+
+  def _frame(self, index):
+    # Only a looping replay comes back to a frame, a single pass would just hoard them
+    if not self.loop:
+      return load_frame(self.paths[index])
+    if index not in self._cache:
+      self._cache[index] = load_frame(self.paths[index])
+    return self._cache[index]
+
+  def grab(self, after=0.0):
+    if self.position >= len(self.paths):
+      if not self.loop:
+        return 0.0, None
+      self.position = 0
+    img = self._frame(self.position)
+    self.position += 1
+    return time.time(), img
+
+class RecordedFrameSource(FrameSource):
+  """
+  Replays a recorded session folder: either one written by utils.recorder
+  (index.bin / frames.bin) or an index.json ([{"t": ..., "file": ...}, ...])
+  next to PNG frames. With realtime=True the original pacing is kept.
+  """
+
+  def __init__(self, path, realtime=False, loop=False):
+    self.path = path
+    self.realtime = realtime
+    self.loop = loop
+    self.reader = None
+    self.index = None
+    if os.path.exists(os.path.join(path, "index.bin")):
+      self.reader = SessionReader(path)
+      length = len(self.reader)
+    else:
+      with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+        self.index = json.load(f)
+      length = len(self.index)
+    if not length:
+      raise FileNotFoundError(f"Empty session in {path}")
+    self.length = length
+    self.position = 0
+    self.recorded_time = 0.0
+    self._started = None
+
+  def _load(self, position):
+    if self.reader:
+      return self.reader.timestamp(position), self.reader.frame(position)
+    entry = self.index[position]
+    return entry["t"], load_frame(os.path.join(self.path, entry["file"]))
+
+  def grab(self, after=0.0):
+    if self.position >= self.length:
+      if not self.loop:
+        return 0.0, None
+      self.position = 0
+      self._started = None
+    recorded_time, img = self._load(self.position)
+    if self.realtime:
+      if self._started is None:
+        self._started = time.time() - recorded_time
+      delay = self._started + recorded_time - time.time()
+      if delay > 0:
+        time.sleep(delay)
+    self.recorded_time = recorded_time
+    self.position += 1
+    return time.time(), img
+
+  def close(self):
+    if self.reader:
+      self.reader.close()
+
+_source = None
+
+def set_frame_source(source):
+  """Swap the source every screen reader uses, None goes back to the live screen"""
+  global _source
+  if _source:
+    _source.close()
+  _source = source
+
+def get_frame_source() -> FrameSource:
+  global _source
+  if _source is None:
+    _source = LiveFrameSource()
+  return _source
@@ -0,0 +1,26 @@
+import pyautogui
+
+from utils.screenshot import invalidate_frame
+
+# Mouse input that can change the screen. Each call marks the shared frame stale,
+# so nothing is matched against a frame taken before the input.
+
+def click(*args, **kwargs):
+  pyautogui.click(*args, **kwargs)
+  invalidate_frame()
+
+def tripleClick(*args, **kwargs):
+  pyautogui.tripleClick(*args, **kwargs)
+  invalidate_frame()
+
+def mouseDown(*args, **kwargs):
+  pyautogui.mouseDown(*args, **kwargs)
+  invalidate_frame()
+
+def mouseUp(*args, **kwargs):
+  pyautogui.mouseUp(*args, **kwargs)
+  invalidate_frame()
+
+def scroll(*args, **kwargs):
+  pyautogui.scroll(*args, **kwargs)
+  invalidate_frame()
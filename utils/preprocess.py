@@ -0,0 +1,38 @@
+import cv2
+import numpy as np
+
+# How each kind of crop is prepared for OCR
+# scale: resize factor (bicubic), contrast: same factor as PIL ImageEnhance.Contrast
+RECIPES = {
+  "enhanced": {"scale": 2, "contrast": 1.5},
+  "plain": {"scale": 1, "contrast": 1.0},
+}
+
+_RAMP = np.arange(256, dtype=np.float32)
+
+def contrast_lut(mean, factor) -> np.ndarray:
+  """Lookup table doing what ImageEnhance.Contrast does around a given mean"""
+  return np.clip(mean + factor * (_RAMP - mean), 0, 255).astype(np.uint8)
+
+def preprocess(crop, recipe="enhanced") -> np.ndarray:
+  """Turn a BGR crop into a new grayscale OCR input following a recipe"""
+  steps = RECIPES[recipe]
+  h, w = crop.shape[:2]
+  scale = steps["scale"]
+
+  out = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+  if scale != 1:
+    out = cv2.resize(out, (w * scale, h * scale), interpolation=cv2.INTER_CUBIC)
+
+  if steps["contrast"] != 1.0:
+    mean = int(cv2.mean(out)[0] + 0.5)
+    cv2.LUT(out, contrast_lut(mean, steps["contrast"]), dst=out)
+
+  return out
+
+def preprocess_batch(crops) -> dict:
+  """
+  Prepare several crops in one call.
+  crops maps a name to (crop, recipe).
+  """
+  return {name: preprocess(crop, recipe) for name, (crop, recipe) in crops.items()}
@@ -0,0 +1,258 @@
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import cv2
+import numpy as np
+
+# t, payload offset, payload length, keyframe number, width, height
+INDEX_RECORD = struct.Struct("<dQIIHH")
+INDEX_DTYPE = np.dtype([("t", "<f8"), ("offset", "<u8"), ("length", "<u4"), ("key", "<u4"), ("width", "<u2"), ("height", "<u2")])
+TILE = 16
+KEYFRAME_EVERY = 30
+FRAMES_GROW = 256 * 1024 * 1024
+INDEX_RECORDS = 65536        # index records preallocated, and added each time it fills up
+
+class _MappedFile:
+  """Append-only file behind an mmap that grows in big steps"""
+
+  def __init__(self, path, capacity, grow):
+    self.grow = grow
+    self.file = open(path, "w+b")
+    self.file.truncate(capacity)
+    self.map = mmap.mmap(self.file.fileno(), capacity)
+    self.size = 0
+
+  def append(self, data) -> int:
+    offset = self.size
+    end = offset + len(data)
+    if end > len(self.map):
+      capacity = max(end, len(self.map) + self.grow)
+      self.map.close()
+      self.file.truncate(capacity)
+      self.map = mmap.mmap(self.file.fileno(), capacity)
+    self.map[offset:end] = data
+    self.size = end
+    return offset
+
+  def close(self):
+    self.map.flush()
+    self.map.close()
+    self.file.truncate(self.size)
+    self.file.close()
+
+def _padded_shape(height, width):
+  return (-(-height // TILE) * TILE, -(-width // TILE) * TILE, 3)
+
+def _tiles(img):
+  h, w = img.shape[:2]
+  return img.reshape(h // TILE, TILE, w // TILE, TILE, 3).swapaxes(1, 2)
+
+class SessionRecorder:
+  """
+  Records every frame the bot reads into frames.bin / index.bin (both memory-mapped)
+  plus ticks.jsonl with the screen type, OCR results and chosen action of each turn.
+  Frames are stored as changed 16x16 tiles against the last keyframe, so any frame
+  decodes from at most two payloads. The caller writes each frame straight into a
+  slot from frame_buffer(), encoding runs on a writer thread and frames are dropped
+  rather than stalling the bot.
+  """
+
+  def __init__(self, path, capacity_mb=512, slots=3):
+    os.makedirs(path, exist_ok=True)
+    self.path = path
+    self.frames = _MappedFile(os.path.join(path, "frames.bin"), capacity_mb * 1024 * 1024, FRAMES_GROW)
+    self.index = _MappedFile(os.path.join(path, "index.bin"), INDEX_RECORD.size * INDEX_RECORDS, INDEX_RECORD.size * INDEX_RECORDS)
+    self.ticks = open(os.path.join(path, "ticks.jsonl"), "a", encoding="utf-8")
+    with open(os.path.join(path, "session.json"), "w", encoding="utf-8") as f:
+      json.dump({"version": 1, "tile": TILE, "keyframe_every": KEYFRAME_EVERY}, f)
+
+    self.count = 0        # frames handed to the writer
+    self.dropped = 0
+    self._slots = [None] * slots
+    self._holds = [0] * slots    # the caller and the writer each hold a recorded slot
+    self._lock = threading.Lock()
+    self._free = queue.Queue()
+    for i in range(slots):
+      self._free.put(i)
+    self._pending = queue.Queue()
+    self._staging = None
+    self._key = None
+    self._key_number = 0
+    self._written = 0
+    self._thread = threading.Thread(target=self._write_loop, name="recorder", daemon=True)
+    self._thread.start()
+
+  def frame_buffer(self, shape):
+    """(slot, buffer) for the next frame, None when every slot is busy and the frame is dropped"""
+    try:
+      slot = self._free.get_nowait()
+    except queue.Empty:
+      self.dropped += 1
+      return None
+    if self._slots[slot] is None or self._slots[slot].shape != shape:
+      self._slots[slot] = np.empty(shape, dtype=np.uint8)
+    self._holds[slot] = 2
+    return slot, self._slots[slot]
+
+  def record(self, slot, timestamp=None) -> int:
+    """Queue the frame written into a slot, returns its frame number"""
+    number = self.count
+    self.count += 1
+    self._pending.put((slot, timestamp or time.time()))
+    return number
+
+  def release(self, slot):
+    """The caller or the writer is done with a slot, it is reused once both are"""
+    with self._lock:
+      self._holds[slot] -= 1
+      if not self._holds[slot]:
+        self._free.put(slot)
+
+  def annotate(self, **fields):
+    """Attach turn data (screen, ocr, action, ...) to the latest recorded frame"""
+    entry = {"frame": self.count - 1, "t": time.time()}
+    entry.update(fields)
+    self.ticks.write(json.dumps(entry, default=str) + "\n")
+    self.ticks.flush()   # a crash must not lose the last turns
+
+  def _write_loop(self):
+    while True:
+      item = self._pending.get()
+      if item is None:
+        return
+      slot, timestamp = item
+      frame = self._slots[slot]
+      h, w = frame.shape[:2]
+      shape = _padded_shape(h, w)
+      if self._staging is None or self._staging.shape != shape:
+        self._staging = np.zeros(shape, dtype=np.uint8)
+      img = self._staging
+      if frame.ndim == 3 and frame.shape[2] == 4:
+        img[:h, :w] = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+      else:
+        img[:h, :w] = frame
+      self.release(slot)
+
+      if self._key is None or self._key.shape != img.shape or self._written % KEYFRAME_EVERY == 0:
+        self._key = img.copy()
+        self._key_number = self._written
+        payload = img.tobytes()
+      else:
+        changed = (_tiles(img) != _tiles(self._key)).any(axis=(2, 3, 4))
+        payload = np.packbits(changed).tobytes() + _tiles(img)[changed].tobytes()
+
+      offset = self.frames.append(payload)
+      self.index.append(INDEX_RECORD.pack(timestamp, offset, len(payload), self._key_number, w, h))
+      self._written += 1
+
+  def close(self):
+    self._pending.put(None)
+    self._thread.join()
+    self.frames.close()
+    self.index.close()
+    self.ticks.close()
+    print(f"[INFO] Session recorded to {self.path}: {self._written} frames, {self.dropped} dropped")
+
+class SessionReader:
+  """
+  Random access to a recorded session without decoding the whole file.
+  A session that was not closed (the bot crashed or was killed) still has its
+  preallocated, zeroed records at the end; the frames stop at the first of them.
+  """
+
+  def __init__(self, path):
+    self.path = path
+    self._files = []
+    self.frames = self._map(os.path.join(path, "frames.bin"))
+    self.index = self._map(os.path.join(path, "index.bin"))
+    self._key_cache = (-1, None)
+
+    records = len(self.index) // INDEX_RECORD.size
+    lengths = np.frombuffer(self.index, INDEX_DTYPE, records)["length"] if records else np.zeros(0)
+    empty = np.flatnonzero(lengths == 0)
+    self.length = int(empty[0]) if len(empty) else records
+    self.complete = self.length == records   # close() cuts the files to what was written
+
+  def _map(self, path):
+    f = open(path, "rb")
+    self._files.append(f)
+    if os.path.getsize(path) == 0:
+      return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+  def __len__(self):
+    return self.length
+
+  def entry(self, number):
+    return INDEX_RECORD.unpack_from(self.index, number * INDEX_RECORD.size)
+
+  def timestamp(self, number) -> float:
+    return self.entry(number)[0]
+
+  def _key_frame(self, number):
+    if self._key_cache[0] != number:
+      _, offset, length, _, w, h = self.entry(number)
+      shape = _padded_shape(h, w)
+      img = np.frombuffer(self.frames, np.uint8, length, offset).reshape(shape)
+      self._key_cache = (number, img)
+    return self._key_cache[1]
+
+  def frame(self, number) -> np.ndarray:
+    """Decode one frame as BGR"""
+    _, offset, length, key_number, w, h = self.entry(number)
+    key = self._key_frame(key_number)
+    if key_number == number:
+      return key[:h, :w]
+
+    rows, cols = key.shape[0] // TILE, key.shape[1] // TILE
+    mask_bytes = -(-(rows * cols) // 8)
+    mask = np.frombuffer(self.frames, np.uint8, mask_bytes, offset)
+    changed = np.unpackbits(mask)[:rows * cols].reshape(rows, cols).astype(bool)
+    tiles = np.frombuffer(self.frames, np.uint8, length - mask_bytes, offset + mask_bytes)
+
+    img = key.copy()
+    _tiles(img)[changed] = tiles.reshape(-1, TILE, TILE, 3)
+    return img[:h, :w]
+
+  def ticks(self):
+    path = os.path.join(self.path, "ticks.jsonl")
+    if not os.path.exists(path):
+      return []
+    with open(path, "r", encoding="utf-8") as f:
+      return [json.loads(line) for line in f if line.strip()]
+
+  def close(self):
+    self._key_cache = (-1, None)
+    for m in (self.frames, self.index):
+      if isinstance(m, mmap.mmap):
+        m.close()
+    for f in self._files:
+      f.close()
+
+_recorder = None
+
+def start_recording(root="sessions", capacity_mb=512) -> SessionRecorder:
+  global _recorder
+  if _recorder is None:
+    path = os.path.join(root, time.strftime("%Y%m%d-%H%M%S"))
+    _recorder = SessionRecorder(path, capacity_mb)
+    print(f"[INFO] Recording session to {path}")
+  return _recorder
+
+def stop_recording():
+  global _recorder
+  if _recorder:
+    _recorder.close()
+    _recorder = None
+
+def get_recorder():
+  return _recorder
+
+def annotate(**fields):
+  """Attach turn data to the recording, does nothing when not recording"""
+  if _recorder:
+    _recorder.annotate(**fields)
@@ -1,6 +1,8 @@
-import pyautogui
+from utils import inputs
+
+from core.recognizer import locate_center
 
 def ura():
-  race_btn = pyautogui.locateCenterOnScreen("assets/ura/ura_race_btn.png", confidence=0.8, minSearchTime=0.2)
+  race_btn = locate_center("assets/ura/ura_race_btn.png", confidence=0.8, min_search_time=0.2)
   if race_btn:
-    pyautogui.click(race_btn)
\ No newline at end of file
+    inputs.click(race_btn)
\ No newline at end of file
@@ -1,35 +1,96 @@
-from PIL import Image, ImageEnhance
-import mss
+from PIL import Image
+import time
 import numpy as np
 
-def enhanced_screenshot(region=(0, 0, 1920, 1080)) -> Image.Image:
-  with mss.mss() as sct:
-    monitor = {
-      "left": region[0],
-      "top": region[1],
-      "width": region[2],
-      "height": region[3]
-    }
-    img = sct.grab(monitor)
-    img_np = np.array(img)
-    img_rgb = img_np[:, :, :3][:, :, ::-1]
-    pil_img = Image.fromarray(img_rgb)
-
-  pil_img = pil_img.resize((pil_img.width * 2, pil_img.height * 2), Image.BICUBIC)
-  pil_img = pil_img.convert("L")
-  pil_img = ImageEnhance.Contrast(pil_img).enhance(1.5)
-
-  return pil_img
+from utils.frame_source import get_frame_source
+from utils.recorder import get_recorder
+from utils.preprocess import preprocess, preprocess_batch
+
+# A frame older than this is grabbed again on the next read
+FRAME_MAX_AGE = 0.5
+
+_frame = None         # the shared BGRA frame, a recorder slot while recording
+_buffer = None        # reusable BGRA buffer for the whole screen when not recording
+_frame_slot = None    # (recorder, slot) holding _frame
+_frame_time = 0.0     # when _frame was grabbed, 0 means stale
+_frame_origin = (0, 0)
+_invalidated_at = 0.0
+_frame_serial = 0     # bumped on every new frame
+
+def _store_frame(img, timestamp, origin) -> np.ndarray:
+  global _frame, _buffer, _frame_slot, _frame_time, _frame_origin, _frame_serial
+  if _frame_slot is not None:
+    _frame_slot[0].release(_frame_slot[1])
+    _frame_slot = None
+
+  # A recorded frame is copied once, straight into the recorder's slot
+  recorder = get_recorder()
+  taken = recorder.frame_buffer(img.shape) if recorder else None
+  if taken:
+    _frame_slot = (recorder, taken[0])
+    _frame = taken[1]
+  else:
+    if _buffer is None or _buffer.shape != img.shape:
+      _buffer = np.empty(img.shape, dtype=np.uint8)
+    _frame = _buffer
+  np.copyto(_frame, img)
+  _frame_time = timestamp
+  _frame_origin = origin
+  _frame_serial += 1
+
+  if taken:
+    recorder.record(taken[0], timestamp)
+  return _frame
+
+def _grab_after(timestamp) -> np.ndarray:
+  source = get_frame_source()
+  frame_time, img = source.grab(timestamp)
+  if img is None:
+    raise EOFError("Frame source has no more frames")
+  return _store_frame(img, frame_time, source.origin)
+
+def refresh_frame() -> np.ndarray:
+  """Load a frame taken after this call into the shared frame buffer"""
+  return _grab_after(time.time())
+
+def invalidate_frame():
+  """Mark the shared frame as stale, call it after anything that changes the screen"""
+  global _frame_time, _invalidated_at
+  _frame_time = 0.0
+  _invalidated_at = time.time()
+
+def get_frame(max_age=FRAME_MAX_AGE) -> np.ndarray:
+  """Return the shared BGRA frame, loading a new one only if it is stale"""
+  if _frame is not None and _frame_time:
+    # Replayed frames stay current until refreshed or invalidated
+    if not get_frame_source().realtime or time.time() - _frame_time <= max_age:
+      return _frame
+  return _grab_after(max(_invalidated_at, time.time() - max_age))
+
+def get_frame_origin() -> tuple:
+  """Screen position of the shared frame's top left pixel"""
+  return _frame_origin
+
+def get_frame_serial() -> int:
+  """Number of the frame currently in the shared buffer"""
+  return _frame_serial
+
+def get_region(region=(0, 0, 1920, 1080), max_age=FRAME_MAX_AGE) -> np.ndarray:
+  """Zero-copy BGR view of a (left, top, width, height) region of the shared frame"""
+  frame = get_frame(max_age)
+  left = region[0] - _frame_origin[0]
+  top = region[1] - _frame_origin[1]
+  return frame[top:top + region[3], left:left + region[2], :3]
+
+def enhanced_screenshot(region=(0, 0, 1920, 1080), recipe="enhanced") -> np.ndarray:
+  """Grayscale OCR input for a region, see utils.preprocess for the recipes"""
+  return preprocess(get_region(region), recipe)
+
+def enhanced_screenshots(regions, recipe="enhanced") -> dict:
+  """Same as enhanced_screenshot for several named regions of one frame"""
+  get_frame()
+  return preprocess_batch({name: (get_region(region), recipe) for name, region in regions.items()})
 
 def capture_region(region=(0, 0, 1920, 1080)) -> Image.Image:
-  with mss.mss() as sct:
-    monitor = {
-      "left": region[0],
-      "top": region[1],
-      "width": region[2],
-      "height": region[3]
-    }
-    img = sct.grab(monitor)
-    img_np = np.array(img)
-    img_rgb = img_np[:, :, :3][:, :, ::-1]
-    return Image.fromarray(img_rgb)
\ No newline at end of file
+  img_rgb = get_region(region)[:, :, ::-1]
+  return Image.fromarray(img_rgb)